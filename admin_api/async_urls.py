@@ -0,0 +1,17 @@
+from django.urls import path
+from .async_views import (
+    export_orders,
+    get_users,
+    get_orders,
+    item_detail,
+    order_stream,
+)
+
+# Async replacements served by the ASGI application, see orders/async_urls.py.
+urlpatterns = [
+    path("items/<int:pk>/", item_detail, name="item_detail"),
+    path("users/", get_users, name="get_users"),
+    path("orders/", get_orders, name="get_orders"),
+    path("orders/stream/", order_stream, name="order_stream"),
+    path("orders/export/", export_orders, name="export_orders"),
+]
@@ -0,0 +1,130 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from orders.decorators import require_auth_async, use_replica
+from orders.models import User, MenuItem, Order
+from orders.pagination import apaginated_response
+from orders.projections import order_projection, user_projection
+from orders.serializers import MenuItemSerializer
+from . import views
+from .export import acsv_stream, aiter_chunks, andjson_stream
+from .feed import event_stream
+from .filters import filter_orders, order_querysets
+
+
+@require_GET
+@require_auth_async
+@use_replica
+async def get_users(request):
+    if not request.is_admin:
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": "Unauthorized admin",
+                "is_admin": request.is_admin,
+            },
+            status=403,
+        )
+    return await apaginated_response(
+        request, User.objects.all(), ("id",), user_projection
+    )
+
+
+@require_GET
+@require_auth_async
+@use_replica
+async def get_orders(request):
+    if not request.is_admin:
+        return JsonResponse(
+            {"status": "error", "message": "Unauthorised Admin!"}, status=403
+        )
+    try:
+        orders = order_querysets(request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return await apaginated_response(
+        request, orders, ("-ordered_at", "-id"), order_projection
+    )
+
+
+@require_GET
+@require_auth_async
+async def export_orders(request):
+    if not request.is_admin:
+        return JsonResponse(
+            {"status": "error", "message": "Unauthorised Admin!"}, status=403
+        )
+    output = request.GET.get("output", "ndjson")
+    if output not in ("ndjson", "csv"):
+        return JsonResponse(
+            {"status": "error", "message": "output must be 'ndjson' or 'csv'"},
+            status=400,
+        )
+    try:
+        orders = filter_orders(Order.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    if output == "csv":
+        response = StreamingHttpResponse(
+            acsv_stream(aiter_chunks(orders)), content_type="text/csv"
+        )
+        response["Content-Disposition"] = 'attachment; filename="orders.csv"'
+    else:
+        response = StreamingHttpResponse(
+            andjson_stream(aiter_chunks(orders)), content_type="application/x-ndjson"
+        )
+    return response
+
+
+@require_auth_async
+@use_replica
+async def _get_item(request, pk):
+    if not request.is_admin:
+        return JsonResponse(
+            {"status": "error", "message": "Unauthorised Admin!!"}, status=403
+        )
+
+    item = await MenuItem.objects.filter(pk=pk).afirst()
+    if item is None:
+        return JsonResponse(
+            {"status": "error", "message": "item not found"}, status=404
+        )
+
+    return JsonResponse(
+        {"status": "success", "data": MenuItemSerializer(item).data}, status=200
+    )
+
+
+@csrf_exempt
+async def item_detail(request, pk):
+    if request.method == "GET":
+        return await _get_item(request, pk)
+    # Writes keep going through the DRF view.
+    return await sync_to_async(views.item_detail)(request, pk)
+
+
+@require_GET
+@require_auth_async
+async def order_stream(request):
+    """New and cancelled orders as Server-Sent Events; ASGI only."""
+    if not request.is_admin:
+        return JsonResponse(
+            {"status": "error", "message": "Unauthorised Admin!"}, status=403
+        )
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    try:
+        since = None if since is None else int(since)
+    except ValueError:
+        return JsonResponse(
+            {"status": "error", "message": "Last-Event-ID must be an event id"},
+            status=400,
+        )
+    response = StreamingHttpResponse(
+        event_stream(since), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
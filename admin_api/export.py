@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from orders.projections import order_projection
+
+
+def iter_chunks(queryset, chunk_size=None):
+    """
+    Yield lists of rendered orders in primary key order, one bounded chunk at
+    a time.
+
+    Each chunk is a separate ``id > last`` range query, so memory stays flat
+    on every backend (MySQLdb would otherwise buffer a whole ``iterator()``
+    result client-side) and no cursor is held open between chunks.
+    """
+    chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    queryset = order_projection.values(queryset.order_by("id"))
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield order_projection.render(chunk)
+        last_id = chunk[-1]["id"]
+
+
+async def aiter_chunks(queryset, chunk_size=None):
+    """
+    ``iter_chunks`` for ASGI. Django drains a sync iterator into a list
+    before sending anything under ASGI, so the export would sit in memory.
+    """
+    chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    queryset = order_projection.values(queryset.order_by("id"))
+    last_id = 0
+    while True:
+        chunk = [row async for row in queryset.filter(id__gt=last_id)[:chunk_size]]
+        if not chunk:
+            return
+        yield order_projection.render(chunk)
+        last_id = chunk[-1]["id"]
+
+
+def _ndjson(chunk):
+    return "\n".join(json.dumps(record) for record in chunk) + "\n"
+
+
+class _CsvEncoder:
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def flush(self):
+        value = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return value
+
+    def header(self):
+        self.writer.writerow(order_projection.field_names)
+        return self.flush()
+
+    def encode(self, chunk):
+        self.writer.writerows(record.values() for record in chunk)
+        return self.flush()
+
+
+def ndjson_stream(chunks):
+    for chunk in chunks:
+        yield _ndjson(chunk)
+
+
+async def andjson_stream(chunks):
+    async for chunk in chunks:
+        yield _ndjson(chunk)
+
+
+def csv_stream(chunks):
+    encoder = _CsvEncoder()
+    yield encoder.header()
+    for chunk in chunks:
+        yield encoder.encode(chunk)
+
+
+async def acsv_stream(chunks):
+    encoder = _CsvEncoder()
+    yield encoder.header()
+    async for chunk in chunks:
+        yield encoder.encode(chunk)
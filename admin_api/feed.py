@@ -0,0 +1,226 @@
+"""
+Live order feed for the admin dashboard, served as Server-Sent Events.
+
+Order events already land in the outbox table (see ``orders.outbox``) in the
+transaction that changes the order, with increasing ids. Each event loop
+runs one ``OrderFeed`` that polls the outbox for ids past its cursor and
+fans the new rows out to per-connection queues, so the database sees one
+indexed range query per poll interval however many admins are connected,
+and an idle connection costs a coroutine and an empty queue. A client that
+reconnects with ``Last-Event-ID`` first replays the rows after that id with
+primary key range queries, then continues with the live stream.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import time
+import weakref
+from collections import deque
+
+from django.conf import settings
+from django.db.models import Q
+from orders.models import OutboxEvent
+
+REPLAY_PAGE_SIZE = 500
+POLL_PAGE_SIZE = 500
+FIELDS = ("id", "topic", "payload")
+# How long an id skipped by a poll may still turn up from a slow transaction.
+GAP_SECONDS = 5
+# Only the ids this close below a new row are watched as gaps.
+MAX_GAP = 1000
+RETRY_MS = 3000
+
+logger = logging.getLogger("admin_api.feed")
+
+
+def format_event(event):
+    data = json.dumps(event["payload"], separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {data}\n\n"
+
+
+async def replay(since):
+    """Yield outbox rows with ``id > since`` in id order, a page per query."""
+    while True:
+        page = [
+            row
+            async for row in OutboxEvent.objects.filter(id__gt=since)
+            .order_by("id")
+            .values(*FIELDS)[:REPLAY_PAGE_SIZE]
+        ]
+        for row in page:
+            yield row
+        if len(page) < REPLAY_PAGE_SIZE:
+            return
+        since = page[-1]["id"]
+
+
+class SubscriberOverflow(Exception):
+    """The client fell too far behind the live stream."""
+
+
+class Subscription:
+    def __init__(self, feed):
+        self.feed = feed
+        self.queue = asyncio.Queue(maxsize=settings.ORDER_FEED_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Rather than buffer without bound, end the stream; the client
+            # reconnects with Last-Event-ID and catches up from the table.
+            self.overflowed = True
+
+    async def get(self, timeout):
+        if self.overflowed and self.queue.empty():
+            raise SubscriberOverflow
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+
+class OrderFeed:
+    """
+    One poller per event loop, started by the first subscriber and stopped
+    when the last one leaves.
+
+    Outbox ids are allocated when a transaction inserts, not when it
+    commits, so a slower transaction can commit an id below the cursor. Ids
+    skipped over by a poll, or missing below the end of the table when the
+    feed starts, are therefore re-checked for ``GAP_SECONDS`` before they
+    are given up as rolled back.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.cursor = None
+        self.gaps = {}  # id -> monotonic deadline
+        self.task = None
+
+    async def subscribe(self):
+        if self.cursor is None:
+            recent = [
+                pk
+                async for pk in OutboxEvent.objects.order_by("-id").values_list(
+                    "id", flat=True
+                )[:MAX_GAP]
+            ]
+            if self.cursor is None:
+                self.cursor = recent[0] if recent else 0
+                # Transactions still in flight below the end of the table are
+                # watched like the gaps a poll skips over.
+                self._watch(self.cursor, time.monotonic(), present=set(recent))
+        subscription = Subscription(self)
+        self.subscribers.add(subscription)
+        if self.task is None or self.task.done():
+            # Started in an empty context, so the poller does not inherit the
+            # first subscriber's request state, such as its query recorder.
+            self.task = contextvars.Context().run(asyncio.create_task, self._run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+        if not self.subscribers:
+            if self.task is not None:
+                self.task.cancel()
+                self.task = None
+            # The next subscriber starts from the end of the table, not from
+            # where this session left off.
+            self.cursor = None
+            self.gaps = {}
+
+    async def poll(self):
+        now = time.monotonic()
+        self.gaps = {pk: due for pk, due in self.gaps.items() if due > now}
+        while True:
+            rows = await self._fetch()
+            self._deliver(rows, now)
+            if len(rows) < POLL_PAGE_SIZE:
+                return
+
+    async def _fetch(self):
+        condition = Q(id__gt=self.cursor)
+        if self.gaps:
+            condition |= Q(id__in=list(self.gaps))
+        return [
+            row
+            async for row in OutboxEvent.objects.filter(condition)
+            .order_by("id")
+            .values(*FIELDS)[:POLL_PAGE_SIZE]
+        ]
+
+    def _watch(self, below, now, after=0, present=()):
+        """Watch the ids between ``after`` and ``below`` not in ``present``."""
+        due = now + GAP_SECONDS
+        for missing in range(max(after, below - MAX_GAP) + 1, below):
+            if missing not in present:
+                self.gaps[missing] = due
+
+    def _deliver(self, rows, now):
+        for row in rows:
+            self.gaps.pop(row["id"], None)
+            if row["id"] > self.cursor:
+                self._watch(row["id"], now, after=self.cursor)
+                self.cursor = row["id"]
+        for subscription in list(self.subscribers):
+            for row in rows:
+                subscription.put(row)
+
+    async def _run(self):
+        while self.subscribers:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Order feed poll failed")
+            await asyncio.sleep(settings.ORDER_FEED_POLL_INTERVAL)
+
+
+_feeds = weakref.WeakKeyDictionary()
+
+
+def get_feed():
+    """The ``OrderFeed`` of the running event loop."""
+    loop = asyncio.get_running_loop()
+    feed = _feeds.get(loop)
+    if feed is None:
+        feed = _feeds[loop] = OrderFeed()
+    return feed
+
+
+async def event_stream(since=None):
+    """
+    SSE body: replay from ``since`` if given, then live events, with a
+    comment line every ``ORDER_FEED_HEARTBEAT`` seconds while idle so
+    proxies keep the connection open.
+    """
+    subscription = await get_feed().subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        # The feed may deliver rows that were just replayed. Skip those by
+        # id, remembering the last MAX_GAP of them, rather than everything up
+        # to the highest one: a row that commits late below it must still go
+        # out when the feed picks it up.
+        recent = deque(maxlen=MAX_GAP)
+        if since is not None:
+            async for row in replay(since):
+                recent.append(row["id"])
+                yield format_event(row)
+        replayed = set(recent)
+        while True:
+            try:
+                row = await subscription.get(settings.ORDER_FEED_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            except SubscriberOverflow:
+                return
+            if row["id"] in replayed:
+                replayed.discard(row["id"])
+                continue
+            yield format_event(row)
+    finally:
+        subscription.close()
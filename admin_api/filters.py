@@ -0,0 +1,67 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from orders.models import ArchivedOrder, Order
+
+
+def parse_bound(value, end=False):
+    """
+    Parse a ``from``/``to`` query parameter into an aware datetime.
+
+    A bare date covers the whole day, so ``to=2025-04-30`` includes orders
+    placed on the 30th.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        if end:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    elif end:
+        moment += timedelta(microseconds=1)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_id(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+
+def filter_orders(queryset, params):
+    """
+    Apply the ``user``, ``menu_item``, ``from`` and ``to`` query parameters.
+
+    Each combination is served by one of the ``Order`` indexes:
+    ``(user, ordered_at)``, ``(menu_item, user)`` or ``(ordered_at)``.
+    Raises ``ValueError`` for malformed values.
+    """
+    if params.get("user"):
+        queryset = queryset.filter(user_id=_parse_id(params["user"], "user"))
+    if params.get("menu_item"):
+        queryset = queryset.filter(
+            menu_item_id=_parse_id(params["menu_item"], "menu_item")
+        )
+    if params.get("from"):
+        queryset = queryset.filter(ordered_at__gte=parse_bound(params["from"]))
+    if params.get("to"):
+        queryset = queryset.filter(ordered_at__lt=parse_bound(params["to"], end=True))
+    return queryset
+
+
+def order_querysets(params):
+    """
+    The filtered ``Order`` queryset, plus the filtered ``ArchivedOrder``
+    one when ``include_archived`` is set; archived orders keep their ids, so
+    the two can be paginated together.
+    """
+    querysets = [filter_orders(Order.objects.all(), params)]
+    if params.get("include_archived") in ("1", "true"):
+        querysets.append(filter_orders(ArchivedOrder.objects.all(), params))
+    return querysets
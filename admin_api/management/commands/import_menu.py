@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_api.menu_import import MenuImportError, import_menu, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create and update menu items from a CSV (id,name,price with a header "
+        "row) or JSON file. Rows with an id update that item, rows without one "
+        "match by name. Every row is validated first; if any is invalid the "
+        "errors are listed and nothing is written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "json"))
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, path, format, batch_size, dry_run, **options):
+        path = Path(path)
+        try:
+            rows = read_rows(path.read_bytes(), format or path.suffix[1:].lower())
+        except (OSError, MenuImportError) as e:
+            raise CommandError(e)
+
+        result = import_menu(rows, batch_size=batch_size, dry_run=dry_run)
+        for error in result.errors:
+            fields = "; ".join(
+                f"{name}: {' '.join(messages)}"
+                for name, messages in error["errors"].items()
+            )
+            self.stderr.write(f"Row {error['row']}: {fields}")
+        if result.errors:
+            raise CommandError(f"{len(result.errors)} invalid rows, nothing imported")
+
+        summary = ", ".join(
+            f"{count} {name}" for name, count in result.as_dict().items()
+        )
+        verb = "Checked" if dry_run else "Imported"
+        self.stdout.write(self.style.SUCCESS(f"{verb} menu: {summary}"))
@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from orders.cache import bump_menu_version
+from orders.models import MenuItem
+
+FIELDS = ("name", "price")
+
+
+class MenuImportError(ValueError):
+    """The payload could not be read as a list of menu items."""
+
+
+@dataclass
+class MenuImportResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+        }
+
+
+def read_rows(content, output):
+    """Parse a CSV (with a header row) or JSON list of menu items."""
+    if isinstance(content, bytes):
+        try:
+            content = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise MenuImportError("file must be UTF-8 encoded")
+    if output == "csv":
+        return list(csv.DictReader(io.StringIO(content)))
+    if output == "json":
+        try:
+            rows = json.loads(content)
+        except ValueError as e:
+            raise MenuImportError(f"invalid JSON: {e}")
+        if isinstance(rows, dict):
+            rows = rows.get("items")
+        if not isinstance(rows, list):
+            raise MenuImportError("expected a list of items")
+        return rows
+    raise MenuImportError("format must be 'csv' or 'json'")
+
+
+def _clean(rows):
+    """
+    Validate every row in one pass with the model fields' own ``clean``.
+
+    Returns ``(items, errors)``: ``items`` maps each row's key (its ``id``, or
+    its name when it has none) to ``(row number, unsaved MenuItem)``, and ``errors`` is a
+    list of ``{"row": n, "errors": {...}}`` with 1-based row numbers.
+    """
+    model_fields = [MenuItem._meta.get_field(name) for name in FIELDS]
+    items, errors = {}, []
+
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": {"row": ["expected an object"]}})
+            continue
+        row_errors, values = {}, {}
+
+        pk = row.get("id")
+        if pk in (None, ""):
+            pk = None
+        else:
+            try:
+                pk = int(pk)
+                if pk < 1:
+                    raise ValueError
+            except (TypeError, ValueError):
+                row_errors["id"] = ["id must be a positive integer"]
+
+        for model_field in model_fields:
+            try:
+                values[model_field.name] = model_field.clean(
+                    row.get(model_field.name), None
+                )
+            except ValidationError as e:
+                row_errors[model_field.name] = e.messages
+
+        if not row_errors:
+            key = pk or values["name"]
+            if key in items:
+                row_errors["id" if pk else "name"] = ["duplicate row in this import"]
+            else:
+                items[key] = (number, MenuItem(id=pk, **values))
+        if row_errors:
+            errors.append({"row": number, "errors": row_errors})
+
+    return items, errors
+
+
+def _update(items, batch_size):
+    # An upsert on the primary key rather than ``bulk_update``, whose per-row
+    # ``CASE WHEN`` makes each statement quadratic in batch size.
+    features = connections[router.db_for_write(MenuItem)].features
+    if features.supports_update_conflicts_with_target:
+        MenuItem.objects.bulk_create(
+            items,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=FIELDS,
+        )
+    elif features.supports_update_conflicts:
+        # MySQL: ON DUPLICATE KEY UPDATE takes no conflict target, and the
+        # primary key is the only unique key on the table.
+        MenuItem.objects.bulk_create(
+            items,
+            batch_size=batch_size,
+            update_conflicts=True,
+            update_fields=FIELDS,
+        )
+    else:
+        MenuItem.objects.bulk_update(items, FIELDS, batch_size=batch_size)
+
+
+def import_menu(rows, batch_size=None, dry_run=False):
+    """
+    Create and update menu items from ``rows`` of ``{"id"?, "name", "price"}``.
+
+    A row with an ``id`` updates that item; a row without one updates the item
+    of the same name, or creates it. All rows are validated before anything is
+    written, and nothing is written if any row is invalid. New items are
+    inserted and changed ones upserted by ``bulk_create`` in ``batch_size``
+    batches in one transaction, and the menu cache version is bumped once on commit, rather
+    than once per row by the model signals.
+    """
+    batch_size = batch_size or settings.MENU_IMPORT_BATCH_SIZE
+    items, errors = _clean(rows)
+    result = MenuImportResult(errors=errors)
+
+    with transaction.atomic():
+        existing = {item.id: item for item in MenuItem.objects.only(*FIELDS)}
+        by_name = {}
+        for item in existing.values():
+            by_name.setdefault(item.name, item)
+
+        to_create, to_update = [], []
+        for number, item in items.values():
+            current = existing.get(item.id) if item.id else by_name.get(item.name)
+            if item.id and current is None:
+                errors.append(
+                    {"row": number, "errors": {"id": [f"no menu item {item.id}"]}}
+                )
+            elif current is None:
+                to_create.append(item)
+            elif (current.name, current.price) == (item.name, item.price):
+                result.unchanged += 1
+            else:
+                item.id = current.id
+                to_update.append(item)
+
+        if errors or dry_run:
+            errors.sort(key=lambda error: error["row"])
+            result.created, result.updated = len(to_create), len(to_update)
+            return result
+
+        MenuItem.objects.bulk_create(to_create, batch_size=batch_size)
+        _update(to_update, batch_size)
+        result.created, result.updated = len(to_create), len(to_update)
+        if to_create or to_update:
+            transaction.on_commit(bump_menu_version)
+    return result
@@ -1,9 +1,20 @@
 from django.urls import path
-from .views import get_users, get_orders, add_item, item_detail
+from .views import (
+    get_users,
+    get_orders,
+    export_orders,
+    sales_report,
+    add_item,
+    import_items,
+    item_detail,
+)
 
 urlpatterns = [
     path("items/add/", add_item, name="add_item"),
+    path("items/import/", import_items, name="import_items"),
     path("items/<int:pk>/", item_detail, name="item_detail"),
     path("users/", get_users, name="get_users"),
     path("orders/", get_orders, name="get_orders"),
+    path("orders/export/", export_orders, name="export_orders"),
+    path("reports/sales/", sales_report, name="sales_report"),
 ]
@@ -1,14 +1,23 @@
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 import jwt
 from rest_framework import status
-from orders.models import User, MenuItem, Order
-from orders.serializers import UserSerializer, MenuItemSerializer, OrderSerializer
-from orders.decorators import require_auth
+from django.db.models import Sum
+from orders.models import User, MenuItem, Order, SalesRollup
+from orders.serializers import MenuItemSerializer
+from orders.decorators import require_auth, use_replica
+from orders.pagination import paginated_response
+from orders.projections import order_projection, user_projection
+from orders.rollups import bucket_for
+from .export import csv_stream, iter_chunks, ndjson_stream
+from .filters import filter_orders, order_querysets, parse_bound
+from .menu_import import MenuImportError, import_menu, read_rows
 
 
 @api_view(["GET"])
 @require_auth
+@use_replica
 def get_users(request):
     if not request.is_admin:
         return Response(
@@ -19,28 +28,134 @@ def get_users(request):
             },
             status=status.HTTP_403_FORBIDDEN,
         )
-    serializer = UserSerializer(User.objects.all(), many=True)
-    return Response(
-        {"status": "success", "data": serializer.data}, status=status.HTTP_200_OK
-    )
+    return paginated_response(request, User.objects.all(), ("id",), user_projection)
 
 
 @api_view(["GET"])
 @require_auth
+@use_replica
 def get_orders(request):
     if not request.is_admin:
         return Response(
             {"status": "error", "message": "Unauthorised Admin!"},
             status=status.HTTP_403_FORBIDDEN,
         )
-    serializer = OrderSerializer(Order.objects.all(), many=True)
+    try:
+        orders = order_querysets(request.query_params)
+    except ValueError as e:
+        return Response(
+            {"status": "error", "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return paginated_response(request, orders, ("-ordered_at", "-id"), order_projection)
+
+
+@api_view(["GET"])
+@require_auth
+def export_orders(request):
+    if not request.is_admin:
+        return Response(
+            {"status": "error", "message": "Unauthorised Admin!"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    output = request.query_params.get("output", "ndjson")
+    if output not in ("ndjson", "csv"):
+        return Response(
+            {"status": "error", "message": "output must be 'ndjson' or 'csv'"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        orders = filter_orders(Order.objects.all(), request.query_params)
+    except ValueError as e:
+        return Response(
+            {"status": "error", "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if output == "csv":
+        response = StreamingHttpResponse(
+            csv_stream(iter_chunks(orders)), content_type="text/csv"
+        )
+        response["Content-Disposition"] = 'attachment; filename="orders.csv"'
+    else:
+        response = StreamingHttpResponse(
+            ndjson_stream(iter_chunks(orders)), content_type="application/x-ndjson"
+        )
+    return response
+
+
+@api_view(["GET"])
+@require_auth
+@use_replica
+def sales_report(request):
+    if not request.is_admin:
+        return Response(
+            {"status": "error", "message": "Unauthorised Admin!"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    params = request.query_params
+    granularity = params.get("granularity", SalesRollup.DAY)
+    by = params.get("by", "item")
+    if granularity not in (SalesRollup.HOUR, SalesRollup.DAY) or by not in (
+        "item",
+        "bucket",
+    ):
+        return Response(
+            {
+                "status": "error",
+                "message": "granularity must be 'hour' or 'day' and by 'item' or 'bucket'",
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    rollups = SalesRollup.objects.filter(granularity=granularity)
+    try:
+        if params.get("from"):
+            start = bucket_for(parse_bound(params["from"]), granularity)
+            rollups = rollups.filter(bucket__gte=start)
+        if params.get("to"):
+            rollups = rollups.filter(bucket__lt=parse_bound(params["to"], end=True))
+        if params.get("menu_item"):
+            rollups = rollups.filter(menu_item_id=int(params["menu_item"]))
+    except ValueError as e:
+        return Response(
+            {"status": "error", "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if by == "item":
+        rows = rollups.order_by("bucket", "menu_item_id").values(
+            "bucket", "menu_item", "quantity", "revenue"
+        )
+    else:
+        rows = (
+            rollups.values("bucket")
+            .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+            .order_by("bucket")
+        )
+    data = [{**row, "revenue": f"{row['revenue']:.2f}"} for row in rows]
+    totals = rollups.aggregate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+
     return Response(
-        {"status": "success", "data": serializer.data}, status=status.HTTP_200_OK
+        {
+            "status": "success",
+            "granularity": granularity,
+            "data": data,
+            "totals": {
+                "quantity": totals["quantity"] or 0,
+                "revenue": f"{totals['revenue'] or 0:.2f}",
+            },
+        },
+        status=status.HTTP_200_OK,
     )
 
 
 @api_view(["GET", "POST"])
 @require_auth
+@use_replica
 def add_item(request):
     if not request.is_admin:
         return Response(
@@ -60,8 +175,58 @@ def add_item(request):
     )
 
 
+@api_view(["POST"])
+@require_auth
+def import_items(request):
+    if not request.is_admin:
+        return Response(
+            {"status": "error", "message": "Unauthorised Admin!"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    try:
+        upload = request.FILES.get("file")
+        if upload is not None:
+            output = request.data.get("format") or upload.name.rpartition(".")[2]
+            rows = read_rows(upload.read(), output.lower())
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            if not isinstance(request.data, dict):
+                raise MenuImportError("expected a list of items")
+            rows = request.data.get("items")
+            if not isinstance(rows, list):
+                raise MenuImportError("expected a list of items")
+    except MenuImportError as e:
+        return Response(
+            {"status": "error", "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    dry_run = request.query_params.get("dry_run") in ("1", "true")
+    result = import_menu(rows, dry_run=dry_run)
+    if result.errors:
+        return Response(
+            {
+                "status": "error",
+                "message": "Menu not imported",
+                "errors": result.errors,
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(
+        {
+            "status": "success",
+            "message": "Menu checked" if dry_run else "Menu imported",
+            "data": result.as_dict(),
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
 @api_view(["GET", "PUT", "DELETE"])
 @require_auth
+@use_replica
 def item_detail(request, pk):
     if not request.is_admin:
         return Response(
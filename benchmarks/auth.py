@@ -0,0 +1,61 @@
+"""
+Per-request authentication overhead: stock ``JWTAuthentication`` (signature
+check plus a ``User`` lookup every time) against ``CachedJWTAuthentication``.
+
+    python -m benchmarks.auth --repeat 2000
+"""
+
+import argparse
+import json
+
+from benchmarks.common import measure, scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from orders.authentication import CachedJWTAuthentication, verified_tokens
+    from orders.models import User
+
+    with scratch_database():
+        user = User.objects.create_user(username="bench", password="bench")
+        refresh = RefreshToken.for_user(user)
+        refresh["is_admin"] = user.is_admin
+        header = f"Bearer {refresh.access_token}"
+        request = Request(
+            APIRequestFactory().get("/orders/menu/", HTTP_AUTHORIZATION=header)
+        )
+
+        results = {}
+        for name, backend in (
+            ("jwt_authentication", JWTAuthentication()),
+            ("cached_jwt_authentication", CachedJWTAuthentication()),
+        ):
+            verified_tokens.clear()
+
+            def authenticate():
+                backend.authenticate(request)
+
+            with CaptureQueriesContext(connection) as queries:
+                authenticate()
+                authenticate()
+            results[name] = {
+                **measure(authenticate, repeat=args.repeat, warmup=10),
+                "queries_per_request": len(queries) / 2,
+            }
+
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Each benchmark is a module run with ``python -m benchmarks.<name>``. It
+creates a throwaway test database on the configured backend, seeds it and
+prints its measurements, so nothing touches the real data.
+"""
+
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "food_ordering_api.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def scratch_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(func, repeat=50, warmup=5):
+    """Time ``func`` and return its latency summary in milliseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+    }
@@ -0,0 +1,316 @@
+"""
+Drive every URL in ``orders/urls.py`` and ``admin_api/urls.py`` through the
+full middleware stack and report throughput, latency percentiles and queries
+per request as JSON.
+
+    DB_ENGINE=django.db.backends.sqlite3 python -m benchmarks.endpoints \\
+        --users 1000 --items 200 --orders 1000000 --output run.json
+
+Requests are issued in-process and one at a time, so the numbers measure the
+application and database, not a network stack. Setup a request needs (a fresh
+refresh token to revoke, an order to cancel, an item to delete) happens
+outside the timed section. Compare two runs with ``jq`` or any JSON diff.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from collections import Counter
+
+from benchmarks.common import percentile, scratch_database, setup_django
+
+
+class Scenario:
+    """One endpoint: ``build(i)`` returns ``(method, path, data, token)``."""
+
+    def __init__(self, name, build, repeat=None):
+        self.name = name
+        self.build = build
+        self.repeat = repeat
+
+
+def scenarios(ctx):
+    from orders.models import MenuItem, Order
+    from orders.tokens import RefreshToken
+
+    user, admin, items = ctx["user"], ctx["admin"], ctx["items"]
+    access, admin_access = ctx["access"], ctx["admin_access"]
+
+    def item(i):
+        return items[i % len(items)]
+
+    def new_order(i):
+        return Order.objects.create(
+            user=user, menu_item=item(i), quantity=1, total_amount=item(i).price
+        )
+
+    return [
+        Scenario("home", lambda i: ("get", "/orders/", None, None)),
+        Scenario(
+            "signup",
+            lambda i: (
+                "post",
+                "/orders/signup/",
+                {
+                    "username": f"signup{i}",
+                    "email": f"signup{i}@example.com",
+                    "password": "benchpass",
+                },
+                None,
+            ),
+        ),
+        Scenario(
+            "login",
+            lambda i: (
+                "post",
+                "/orders/login/",
+                {"username": user.username, "password": ctx["password"]},
+                None,
+            ),
+        ),
+        Scenario(
+            "logout",
+            lambda i: (
+                "post",
+                "/orders/logout/",
+                {"refresh_token": str(RefreshToken.for_user(user))},
+                None,
+            ),
+        ),
+        Scenario("browse_menu", lambda i: ("get", "/orders/menu/", None, access)),
+        Scenario(
+            "order_menu_item",
+            lambda i: (
+                "post",
+                f"/orders/item/{item(i).id}/order/",
+                {"quantity": 2},
+                access,
+            ),
+        ),
+        Scenario(
+            "checkout_cart",
+            lambda i: (
+                "post",
+                "/orders/cart/checkout/",
+                {"items": [{"menu_item": item(i + n).id} for n in range(5)]},
+                access,
+            ),
+        ),
+        Scenario(
+            "cancel_order",
+            lambda i: (
+                "delete",
+                f"/orders/item{new_order(i).menu_item_id}/cancel/",
+                None,
+                access,
+            ),
+        ),
+        Scenario(
+            "cancel_orders_bulk",
+            lambda i: (
+                "post",
+                "/orders/cancel/",
+                {"orders": [new_order(i + n).id for n in range(5)]},
+                access,
+            ),
+        ),
+        Scenario(
+            "user_orders", lambda i: ("get", "/orders/user_orders/", None, access)
+        ),
+        Scenario(
+            "admin_add_item",
+            lambda i: (
+                "post",
+                "/admin_api/items/add/",
+                {"name": f"Special {i}", "price": "99.00"},
+                admin_access,
+            ),
+        ),
+        Scenario(
+            "admin_import_items",
+            lambda i: (
+                "post",
+                "/admin_api/items/import/",
+                [
+                    {"name": f"Import {i}-{n}", "price": f"{10 + n}.00"}
+                    for n in range(100)
+                ],
+                admin_access,
+            ),
+            repeat=10,
+        ),
+        Scenario(
+            "admin_get_item",
+            lambda i: ("get", f"/admin_api/items/{item(i).id}/", None, admin_access),
+        ),
+        Scenario(
+            "admin_update_item",
+            lambda i: (
+                "put",
+                f"/admin_api/items/{item(i).id}/",
+                {"name": item(i).name, "price": str(item(i).price)},
+                admin_access,
+            ),
+        ),
+        Scenario(
+            "admin_delete_item",
+            lambda i: (
+                "delete",
+                "/admin_api/items/%d/"
+                % MenuItem.objects.create(name=f"Temp {i}", price=1).id,
+                None,
+                admin_access,
+            ),
+        ),
+        Scenario(
+            "admin_users", lambda i: ("get", "/admin_api/users/", None, admin_access)
+        ),
+        Scenario(
+            "admin_orders", lambda i: ("get", "/admin_api/orders/", None, admin_access)
+        ),
+        Scenario(
+            "admin_orders_filtered",
+            lambda i: (
+                "get",
+                f"/admin_api/orders/?user={user.id}" f"&menu_item={item(i).id}",
+                None,
+                admin_access,
+            ),
+        ),
+        Scenario(
+            "admin_export",
+            lambda i: ("get", "/admin_api/orders/export/", None, admin_access),
+            repeat=3,
+        ),
+        Scenario(
+            "admin_sales_report",
+            lambda i: (
+                "get",
+                "/admin_api/reports/sales/?granularity=day",
+                None,
+                admin_access,
+            ),
+        ),
+    ]
+
+
+def run(scenario, client, repeat, warmup):
+    from food_ordering_api.instrumentation import record_queries
+
+    samples, queries, statuses = [], [], Counter()
+    total = warmup + (scenario.repeat or repeat)
+    for i in range(total):
+        method, path, data, token = scenario.build(i)
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        with record_queries() as recorded:
+            start = time.perf_counter()
+            response = getattr(client, method)(path, data, format="json", **headers)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+        if i < warmup:
+            continue
+        samples.append(elapsed * 1000)
+        queries.append(len(recorded))
+        statuses[response.status_code] += 1
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / (sum(samples) / 1000), 1),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "queries_per_request": round(statistics.mean(queries), 2),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--only", action="append", help="run only these scenarios (repeatable)"
+    )
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    # Every scenario comes from one client and IP; measure the endpoints, not
+    # the throttles.
+    for scope in ("ORDER", "SIGNUP", "LOGIN"):
+        os.environ.setdefault(f"THROTTLE_{scope}_RATE", "")
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from rest_framework.test import APIClient
+
+    from benchmarks.factories import PASSWORD, UserFactory, seed
+    from orders.views import login_payload
+
+    with scratch_database() as connection:
+        start = time.perf_counter()
+        users, items = seed(args.users, args.items, args.orders, seed=args.seed)
+        call_command("rebuild_sales_rollups", verbosity=0)
+        admin = UserFactory(username="bench-admin", is_admin=True)
+        seed_seconds = time.perf_counter() - start
+
+        ctx = {
+            "user": users[0],
+            "admin": admin,
+            "items": items,
+            "password": PASSWORD,
+            "access": login_payload(users[0])["access"],
+            "admin_access": login_payload(admin)["access"],
+        }
+        client = APIClient()
+        results = {}
+        for scenario in scenarios(ctx):
+            if args.only and scenario.name not in args.only:
+                continue
+            results[scenario.name] = run(scenario, client, args.repeat, args.warmup)
+
+        report = {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "dataset": {
+                "users": args.users,
+                "items": args.items,
+                "orders": args.orders,
+                "seed": args.seed,
+                "seed_seconds": round(seed_seconds, 1),
+            },
+            "endpoints": results,
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measure ``browse_menu`` latency while a burst of logins is in flight on the
+ASGI stack, with the sync DRF login views and with the async views that hash
+passwords on the worker pool.
+
+    python -m benchmarks.login_storm --logins 16 --menu-requests 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from benchmarks.common import percentile, scratch_database, setup_django
+
+
+async def storm(logins, menu_requests):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    samples = []
+
+    async def login():
+        await client.post(
+            "/orders/login/",
+            {"username": "bench", "password": "bench-password"},
+            content_type="application/json",
+        )
+
+    async def browse():
+        await asyncio.sleep(0.01)  # let the logins get going first
+        for _ in range(menu_requests):
+            start = time.perf_counter()
+            await client.get("/orders/menu/")
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(browse(), *(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    return {
+        "menu_p50_ms": round(statistics.median(samples), 2),
+        "menu_p95_ms": round(percentile(samples, 95), 2),
+        "menu_max_ms": round(max(samples), 2),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--menu-requests", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+
+    from orders.models import MenuItem, User
+
+    with scratch_database():
+        User.objects.create_user(username="bench", password="bench-password")
+        MenuItem.objects.bulk_create(
+            [MenuItem(name=f"Item {i}", price=10 + i) for i in range(50)]
+        )
+
+        results = {
+            "no_logins": asyncio.run(storm(0, args.menu_requests)),
+        }
+        with override_settings(ASGI_URLCONF=None):
+            results["sync_login_views"] = asyncio.run(
+                storm(args.logins, args.menu_requests)
+            )
+        results["async_login_views"] = asyncio.run(
+            storm(args.logins, args.menu_requests)
+        )
+        print(json.dumps({"logins": args.logins, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Type-ahead latency of the in-process menu index against ``icontains``.
+
+    python -m benchmarks.menu_search --items 100000
+
+Seeds a catalog of two-word item names, then times each query prefix (as a
+client would send it while typing) through ``menu_index.search`` and as a
+``name__icontains`` query. Also reports the cost of the first build and of
+an incremental resync after one item changes.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import measure, scratch_database, setup_django
+
+QUERIES = ("p", "pa", "pan", "pane", "paneer", "paneer ti", "ka", "masala")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from faker import Faker
+
+    from orders.cache import bump_menu_version, get_menu_payload
+    from orders.models import MenuItem
+    from orders.search import MenuIndex
+
+    fake = Faker()
+    Faker.seed(0)
+    random.seed(0)
+    dishes = ["paneer tikka", "masala dosa", "kadai paneer", "pani puri"]
+
+    with scratch_database():
+        names = [
+            random.choice(dishes) if i % 50 == 0 else f"{fake.word()} {fake.word()}"
+            for i in range(args.items)
+        ]
+        MenuItem.objects.bulk_create(
+            [
+                MenuItem(name=name, price=f"{random.randint(10, 500)}.00")
+                for name in names
+            ],
+            batch_size=5000,
+        )
+        version, data = get_menu_payload()
+
+        index = MenuIndex()
+        start = time.perf_counter()
+        index.sync(version, data)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        item = MenuItem.objects.first()
+        item.name = "paneer butter masala"
+        item.save()
+        version, data = get_menu_payload(bump_menu_version())
+        start = time.perf_counter()
+        index.sync(version, data)
+        resync_ms = (time.perf_counter() - start) * 1000
+
+        queries = {}
+        for q in QUERIES:
+            queries[q] = {
+                "matches": len(index.search(version, data, q=q)),
+                "index": measure(
+                    lambda: index.search(version, data, q=q, limit=args.limit),
+                    args.repeat,
+                ),
+                "icontains": measure(
+                    lambda: list(
+                        MenuItem.objects.filter(name__icontains=q).values()[
+                            : args.limit
+                        ]
+                    ),
+                    max(1, args.repeat // 20),
+                ),
+            }
+        queries["price 100-120"] = {
+            "index": measure(
+                lambda: index.search(
+                    version, data, min_price=100, max_price=120, limit=args.limit
+                ),
+                args.repeat,
+            )
+        }
+
+        print(
+            json.dumps(
+                {
+                    "items": args.items,
+                    "build_ms": round(build_ms, 1),
+                    "resync_one_change_ms": round(resync_ms, 1),
+                    "queries": queries,
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare the cost of the first page of the order listing with deep pages.
+
+    python -m benchmarks.pagination --orders 200000 --page-size 100
+"""
+
+import argparse
+import json
+
+from benchmarks.common import measure, scratch_database, setup_django
+
+
+def seed(orders, batch_size=5000):
+    from orders.models import MenuItem, Order, User
+
+    User.objects.bulk_create(
+        [User(username=f"bench{i}", password="x") for i in range(10)]
+    )
+    MenuItem.objects.bulk_create(
+        [MenuItem(name=f"Item {i}", price=10 + i) for i in range(20)]
+    )
+    users = list(User.objects.all())
+    items = list(MenuItem.objects.all())
+    for start in range(0, orders, batch_size):
+        Order.objects.bulk_create(
+            [
+                Order(
+                    user=users[i % len(users)],
+                    menu_item=items[i % len(items)],
+                    quantity=1,
+                    total_amount=10,
+                )
+                for i in range(start, min(start + batch_size, orders))
+            ]
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from orders.models import Order
+    from orders.pagination import KeysetPaginator, _encode_cursor, _key_value
+
+    with scratch_database():
+        seed(args.orders)
+        paginator = KeysetPaginator(("-ordered_at", "-id"), page_size=args.page_size)
+        ordered = Order.objects.order_by(*paginator.ordering)
+        factory = APIRequestFactory()
+
+        results = {}
+        for depth in (0, 10, 100, 999):
+            position = depth * args.page_size
+            if position >= args.orders:
+                break
+            params = {}
+            if depth:
+                row = ordered[position - 1]
+                keys = [_key_value(row, field) for field in paginator.fields]
+                params["cursor"] = _encode_cursor(keys, False)
+            request = Request(factory.get("/admin_api/orders/", params))
+
+            def fetch():
+                paginator.paginate_queryset(Order.objects.all(), request)
+
+            with CaptureQueriesContext(connection) as queries:
+                fetch()
+            results[f"page_{depth + 1}"] = {
+                **measure(fetch, repeat=args.repeat),
+                "queries": len(queries),
+            }
+
+        print(json.dumps({"orders": args.orders, "pages": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Render time and bytes on the wire for the list endpoints.
+
+    python -m benchmarks.rendering --orders 20000 --page-size 1000
+
+For each endpoint the payload is fetched once, then rendered with DRF's
+``JSONRenderer`` and with ``FastJSONRenderer``, and compressed the way
+``CompressionMiddleware`` would compress it.
+"""
+
+import argparse
+import json
+
+from benchmarks.common import measure, scratch_database, setup_django
+
+ENDPOINTS = {
+    "menu": "/orders/menu/",
+    "user_orders": "/orders/user_orders/",
+    "admin_orders": "/admin_api/orders/",
+    "admin_users": "/admin_api/users/",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.utils.text import compress_string
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIClient
+
+    from benchmarks.factories import UserFactory, seed
+    from orders.renderers import FastJSONRenderer, orjson
+    from orders.views import login_payload
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    with scratch_database():
+        users, _ = seed(args.users, args.items, args.orders)
+        admin = UserFactory(username="bench-admin", is_admin=True)
+        client = APIClient()
+        stock, fast = JSONRenderer(), FastJSONRenderer()
+
+        results = {}
+        for name, path in ENDPOINTS.items():
+            token = login_payload(admin if "admin" in name else users[0])["access"]
+            response = client.get(
+                path,
+                {"page_size": args.page_size},
+                HTTP_AUTHORIZATION=f"Bearer {token}",
+            )
+            data = response.data
+            body = stock.render(data)
+            assert fast.render(data) == body
+            result = {
+                "rows": len(data["data"]),
+                "render_stock": measure(lambda: stock.render(data), args.repeat),
+                "render_fast": measure(lambda: fast.render(data), args.repeat),
+                "bytes_identity": len(body),
+                "bytes_gzip": len(compress_string(body)),
+                "gzip": measure(lambda: compress_string(body), args.repeat),
+            }
+            if brotli is not None:
+                quality = settings.BROTLI_QUALITY
+                result["bytes_br"] = len(brotli.compress(body, quality=quality))
+                result["br"] = measure(
+                    lambda: brotli.compress(body, quality=quality), args.repeat
+                )
+            result["render_speedup"] = round(
+                result["render_stock"]["p50_ms"] / result["render_fast"]["p50_ms"], 1
+            )
+            results[name] = result
+
+        print(
+            json.dumps(
+                {
+                    "orjson": orjson is not None,
+                    "brotli": brotli is not None,
+                    "page_size": args.page_size,
+                    "endpoints": results,
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
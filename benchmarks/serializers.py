@@ -0,0 +1,79 @@
+"""
+Serialize order lists through ``OrderSerializer`` and through the
+``values()`` projection, checking the JSON is byte-identical.
+
+    python -m benchmarks.serializers --sizes 1000 10000 100000
+"""
+
+import argparse
+import json
+
+from benchmarks.common import measure, scratch_database, setup_django
+
+
+def seed(count, batch_size=5000):
+    from orders.models import MenuItem, Order, User
+
+    user, created = User.objects.get_or_create(username="bench")
+    if created:
+        MenuItem.objects.bulk_create(
+            [MenuItem(name=f"Item {i}", price=f"{10 + i}.50") for i in range(20)]
+        )
+    items = list(MenuItem.objects.all())
+    for start in range(0, count, batch_size):
+        Order.objects.bulk_create(
+            [
+                Order(
+                    user=user,
+                    menu_item=items[i % len(items)],
+                    quantity=1 + i % 3,
+                    total_amount=10 + i % 50,
+                )
+                for i in range(start, min(start + batch_size, count))
+            ]
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+
+    from orders.models import Order
+    from orders.projections import order_projection
+    from orders.serializers import OrderSerializer
+
+    renderer = JSONRenderer()
+    results = {}
+    with scratch_database():
+        seeded = 0
+        for size in sorted(args.sizes):
+            seed(size - seeded)
+            seeded = size
+            queryset = Order.objects.order_by("id")
+
+            def serializer():
+                return renderer.render(OrderSerializer(queryset, many=True).data)
+
+            def projection():
+                rows = order_projection.values(queryset)
+                return renderer.render(order_projection.render(rows))
+
+            assert serializer() == projection(), "projection output differs"
+            before = measure(serializer, repeat=args.repeat, warmup=1)
+            after = measure(projection, repeat=args.repeat, warmup=1)
+            results[size] = {
+                "serializer": before,
+                "projection": after,
+                "speedup": round(before["p50_ms"] / after["p50_ms"], 1),
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
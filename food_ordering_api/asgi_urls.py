@@ -0,0 +1,16 @@
+"""
+URL configuration used by the ASGI application.
+
+Native async views are matched first; every other route is the same as in
+``food_ordering_api.urls``.
+"""
+
+from django.urls import include, path
+
+from . import urls
+
+urlpatterns = [
+    path("orders/", include("orders.async_urls")),
+    path("admin_api/", include("admin_api.async_urls")),
+    *urls.urlpatterns,
+]
@@ -0,0 +1,97 @@
+import contextvars
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Transaction bookkeeping issued by ``atomic()`` (SQLite opens transactions
+# with an explicit BEGIN); not counted as queries.
+TRANSACTION_CONTROL = re.compile(
+    r"^\s*(BEGIN|SAVEPOINT|RELEASE\s+SAVEPOINT|ROLLBACK\s+TO\s+SAVEPOINT)\b", re.I
+)
+
+# Active recorders, innermost last; nested blocks all see the same queries.
+_recorders = contextvars.ContextVar("query_recorders", default=())
+
+
+class QueryRecorder:
+    """Queries executed while the recorder is active, on any connection."""
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+
+    def __len__(self):
+        return len(self.queries)
+
+    def __iter__(self):
+        return iter(self.queries)
+
+    def record(self, alias, sql, duration):
+        self.db_time += duration
+        if not TRANSACTION_CONTROL.match(sql):
+            self.queries.append({"alias": alias, "sql": sql, "time": duration})
+
+    def repeated(self, threshold):
+        """Query shapes (parametrised SQL) executed at least ``threshold`` times."""
+        shapes = Counter((query["alias"], query["sql"]) for query in self.queries)
+        return [
+            {"alias": alias, "sql": sql, "count": count}
+            for (alias, sql), count in shapes.most_common()
+            if count >= threshold
+        ]
+
+
+def _execute_wrapper(alias):
+    def wrapper(execute, sql, params, many, context):
+        recorders = _recorders.get()
+        if not recorders:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            for recorder in recorders:
+                recorder.record(alias, sql, duration)
+
+    wrapper.query_recorder = True
+    return wrapper
+
+
+def install(connection):
+    """Hook ``connection`` so its queries reach the active recorder."""
+    if not any(
+        getattr(wrapper, "query_recorder", False)
+        for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(_execute_wrapper(connection.alias))
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+connection_created.connect(_on_connection_created)
+
+
+@contextmanager
+def record_queries():
+    """
+    Collect the queries run inside the block into a ``QueryRecorder``.
+
+    The recorder lives in a context variable, so queries issued from
+    ``sync_to_async`` threads by async views are attributed to the request
+    that awaited them.
+    """
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    recorder = QueryRecorder()
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
@@ -0,0 +1,209 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIRequest
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .instrumentation import record_queries
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = logging.getLogger("food_ordering_api.queries")
+
+
+class AsgiUrlconfMiddleware:
+    """Route requests served through asgi.py with ``settings.ASGI_URLCONF``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, "ASGI_URLCONF", None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _route(self, request):
+        if self.urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._route(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self._route(request)
+        return await self.get_response(request)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query count, DB time and view time for every request.
+
+    The numbers are sent back in a ``Server-Timing`` header and logged as one
+    JSON line on ``food_ordering_api.queries``. Identical query shapes that
+    repeat ``QUERY_REPEAT_THRESHOLD`` times or more are logged as a likely
+    N+1 at WARNING. Streaming responses only account for the work done before
+    the first chunk.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SQL_INSTRUMENTATION", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.repeat_threshold = getattr(settings, "QUERY_REPEAT_THRESHOLD", 3)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with record_queries() as queries:
+            response = self.get_response(request)
+        return self._report(request, response, queries, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with record_queries() as queries:
+            response = await self.get_response(request)
+        return self._report(request, response, queries, start)
+
+    def _report(self, request, response, queries, start):
+        view_ms = (time.perf_counter() - start) * 1000
+        db_ms = queries.db_time * 1000
+        response["Server-Timing"] = (
+            f'db;dur={db_ms:.2f};desc="{len(queries)} queries", '
+            f"view;dur={view_ms:.2f}"
+        )
+        repeated = queries.repeated(self.repeat_threshold)
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "queries": len(queries),
+                    "db_ms": round(db_ms, 2),
+                    "view_ms": round(view_ms, 2),
+                    "repeated": len(repeated),
+                }
+            )
+        )
+        for shape in repeated:
+            logger.warning(
+                "Possible N+1 on %s %s: %d x %s",
+                request.method,
+                request.path,
+                shape["count"],
+                shape["sql"],
+            )
+        return response
+
+
+def _accepted_encodings(header):
+    """Map each coding in an ``Accept-Encoding`` header to its q-value."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    return accepted
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses with brotli (if installed) or gzip, by ``Accept-Encoding``.
+
+    Bodies under ``COMPRESSION_MIN_SIZE`` bytes and server-sent event streams,
+    which must reach the client as they are written, are left alone. Ties in
+    q-value prefer brotli.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.brotli_quality = getattr(settings, "BROTLI_QUALITY", 4)
+
+    def _encoding(self, request):
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        wildcard = accepted.get("*", 0.0)
+        candidates = (["br"] if brotli is not None else []) + ["gzip"]
+        best, best_quality = None, 0.0
+        for coding in candidates:
+            quality = accepted.get(coding, wildcard)
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        encoding = self._encoding(request)
+        if encoding == "gzip":
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if encoding != "br":
+            return response
+
+        if response.streaming:
+            response.streaming_content = self._brotli_stream(response)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+    def _brotli_stream(self, response):
+        compressor = brotli.Compressor(quality=self.brotli_quality)
+        content = response.streaming_content
+        if response.is_async:
+
+            async def compress():
+                async for chunk in content:
+                    yield compressor.process(chunk) + compressor.flush()
+                yield compressor.finish()
+
+            return compress()
+
+        def compress():
+            for chunk in content:
+                yield compressor.process(chunk) + compressor.flush()
+            yield compressor.finish()
+
+        return compress()
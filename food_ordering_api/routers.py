@@ -0,0 +1,64 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+STICKY_KEY = "db:primary:{user_id}"
+
+_reading_replica = contextvars.ContextVar("reading_replica", default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Send ORM reads inside the block to ``settings.REPLICA_DATABASE``."""
+    token = _reading_replica.set(True)
+    try:
+        yield
+    finally:
+        _reading_replica.reset(token)
+
+
+def pin_primary(user_id):
+    """Keep ``user_id`` reading from the primary for the sticky window."""
+    if user_id is not None and settings.REPLICA_DATABASE:
+        cache.set(
+            STICKY_KEY.format(user_id=user_id), True, settings.REPLICA_STICKY_SECONDS
+        )
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(STICKY_KEY.format(user_id=user_id), False)
+
+
+async def ais_pinned(user_id):
+    return user_id is not None and await cache.aget(
+        STICKY_KEY.format(user_id=user_id), False
+    )
+
+
+class ReplicaRouter:
+    """
+    Route reads to the replica inside ``replica_reads()``; everything else,
+    and all writes, use ``default``.
+
+    The flag lives in a context variable, so it follows async views into the
+    ``sync_to_async`` threads that run their queries.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = settings.REPLICA_DATABASE
+        if replica and _reading_replica.get():
+            return replica
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from replication, not from migrate.
+        return db != settings.REPLICA_DATABASE
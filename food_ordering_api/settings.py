@@ -50,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "food_ordering_api.middleware.QueryInstrumentationMiddleware",
+    "food_ordering_api.middleware.CompressionMiddleware",
+    "food_ordering_api.middleware.AsgiUrlconfMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,25 +81,95 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "food_ordering_api.wsgi.application"
 
+# Requests served by asgi.py resolve against this urlconf, which swaps in
+# native async views where we have them.
+ASGI_URLCONF = "food_ordering_api.asgi_urls"
+
+# Threads used to hash and verify passwords for the async login/signup views.
+PASSWORD_HASHING_WORKERS = config("PASSWORD_HASHING_WORKERS", default=4, cast=int)
+
+# Responses at least this many bytes are compressed with brotli (if the
+# package is installed) or gzip, whichever the client accepts.
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=1024, cast=int)
+BROTLI_QUALITY = config("BROTLI_QUALITY", default=4, cast=int)
+
+# Per-request query count / DB time in a Server-Timing header and a log line.
+# Identical queries repeated this many times in one request are logged as N+1.
+SQL_INSTRUMENTATION = config("SQL_INSTRUMENTATION", default=True, cast=bool)
+QUERY_REPEAT_THRESHOLD = config("QUERY_REPEAT_THRESHOLD", default=3, cast=int)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 # print("DB USER:", config("DB_USER"))
 
-DATABASES = {
+# DB_ENGINE=django.db.backends.sqlite3 runs against a local SQLite file (NAME,
+# default db.sqlite3) with no server, e.g. for benchmarks.
+DB_ENGINE = config("DB_ENGINE", default="django.db.backends.mysql")
+
+if DB_ENGINE == "django.db.backends.sqlite3":
+    DATABASES = {
+        "default": {
+            "ENGINE": DB_ENGINE,
+            "NAME": config("NAME", default=str(BASE_DIR / "db.sqlite3")),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": DB_ENGINE,
+            "USER": config("DB_USER"),
+            "NAME": config("NAME"),
+            "PASSWORD": config("PASSWORD"),
+            "HOST": config("HOST"),
+            "PORT": config("PORT"),
+            "OPTIONS": {
+                "init_command": "SET foreign_key_checks = 0;",
+            },
+        }
+    }
+
+# Optional read replica. Set REPLICA_NAME (and REPLICA_HOST / REPLICA_PORT for
+# MySQL) to route list and detail reads there; see orders.decorators.use_replica.
+# With SQLite, REPLICA_NAME is a second database file.
+if config("REPLICA_NAME", default=""):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": config("REPLICA_NAME"),
+        "TEST": {"MIRROR": "default"},
+    }
+    if DB_ENGINE != "django.db.backends.sqlite3":
+        DATABASES["replica"]["HOST"] = config("REPLICA_HOST", default=config("HOST"))
+        DATABASES["replica"]["PORT"] = config("REPLICA_PORT", default=config("PORT"))
+    REPLICA_DATABASE = "replica"
+else:
+    REPLICA_DATABASE = None
+
+DATABASE_ROUTERS = ["food_ordering_api.routers.ReplicaRouter"]
+
+# After a write, the user's reads stay on the primary this long so they see
+# their own changes despite replication lag.
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=int)
+
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
-        "USER": config("DB_USER"),
-        "NAME": config("NAME"),
-        "PASSWORD": config("PASSWORD"),
-        "HOST": config("HOST"),
-        "PORT": config("PORT"),
-        "OPTIONS": {
-            "init_command": "SET foreign_key_checks = 0;",
-        },
+        "BACKEND": config(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="food-ordering"),
     }
 }
 
+# Serialized menu payloads are keyed by version, so this only bounds how long
+# an unused version lingers in the shared cache.
+MENU_CACHE_TIMEOUT = config("MENU_CACHE_TIMEOUT", default=60 * 60, cast=int)
+# With a per-process cache (the locmem default) workers cannot see each
+# other's menu version bumps, so each one re-reads the menu after this many
+# seconds. Unused with a shared CACHE_BACKEND, where bumps reach every worker.
+MENU_VERSION_LOCAL_TIMEOUT = config("MENU_VERSION_LOCAL_TIMEOUT", default=30, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,14 +214,96 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+
+def _rate(value):
+    return value or None
+
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "orders.authentication.CachedJWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "orders.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "PAGE_SIZE": config("PAGE_SIZE", default=100, cast=int),
+    # Token buckets in orders/throttling.py; an empty value disables a scope.
+    "DEFAULT_THROTTLE_RATES": {
+        "order": config("THROTTLE_ORDER_RATE", default="60/min", cast=_rate),
+        "signup": config("THROTTLE_SIGNUP_RATE", default="10/hour", cast=_rate),
+        "login": config("THROTTLE_LOGIN_RATE", default="20/min", cast=_rate),
+    },
 }
 
+# Upper bound for the ``page_size`` query parameter on list endpoints.
+MAX_PAGE_SIZE = config("MAX_PAGE_SIZE", default=1000, cast=int)
+
+# How long a response is kept for replay under its Idempotency-Key, and how
+# long a duplicate waits for the original request before giving up with 409.
+IDEMPOTENCY_KEY_TTL = config("IDEMPOTENCY_KEY_TTL", default=24 * 60 * 60, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config("IDEMPOTENCY_LOCK_TIMEOUT", default=10, cast=int)
+
+# Rows fetched per query while streaming the admin order export.
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
+# Rows per INSERT/UPDATE statement in the bulk menu import.
+MENU_IMPORT_BATCH_SIZE = config("MENU_IMPORT_BATCH_SIZE", default=1000, cast=int)
+
+# Consumers of order events, drained from the outbox by ``manage.py
+# drain_outbox``; see orders/outbox.py. Each entry is a dotted sink class and
+# its keyword arguments, like CACHES. OUTBOX_FILE adds an NDJSON file sink.
+OUTBOX_SINKS = {"log": {"BACKEND": "orders.outbox.LoggingSink"}}
+if config("OUTBOX_FILE", default=""):
+    OUTBOX_SINKS["file"] = {
+        "BACKEND": "orders.outbox.FileSink",
+        "OPTIONS": {"path": config("OUTBOX_FILE")},
+    }
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=100, cast=int)
+# Seconds a worker holds a claimed batch before another may retry it.
+OUTBOX_LEASE_SECONDS = config("OUTBOX_LEASE_SECONDS", default=60, cast=int)
+# Retry delays double from OUTBOX_BACKOFF up to OUTBOX_MAX_BACKOFF seconds.
+OUTBOX_BACKOFF = config("OUTBOX_BACKOFF", default=1, cast=float)
+OUTBOX_MAX_BACKOFF = config("OUTBOX_MAX_BACKOFF", default=300, cast=float)
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", default=10, cast=int)
+# Delivered events are kept this long, then purged by the worker.
+OUTBOX_RETENTION_HOURS = config("OUTBOX_RETENTION_HOURS", default=72, cast=int)
+
+# Live admin order feed (admin_api/feed.py): seconds between outbox polls per
+# process, seconds between keep-alive comments on an idle stream, and events
+# buffered per connection before a slow client is dropped to resume later.
+ORDER_FEED_POLL_INTERVAL = config("ORDER_FEED_POLL_INTERVAL", default=1.0, cast=float)
+ORDER_FEED_HEARTBEAT = config("ORDER_FEED_HEARTBEAT", default=15, cast=float)
+ORDER_FEED_QUEUE_SIZE = config("ORDER_FEED_QUEUE_SIZE", default=1000, cast=int)
+
+# Delta sync of order history (orders/sync.py): how far back a sync token
+# reaches to cover in-flight transactions, and how long cancelled orders are
+# remembered, which is also how old a token may be.
+ORDER_SYNC_OVERLAP_SECONDS = config("ORDER_SYNC_OVERLAP_SECONDS", default=5, cast=int)
+ORDER_TOMBSTONE_RETENTION_DAYS = config(
+    "ORDER_TOMBSTONE_RETENTION_DAYS", default=30, cast=int
+)
+
+# Order archival (orders/archive.py): orders older than this many days are
+# moved to the archive table by ``manage.py archive_orders``, this many per
+# transaction, pausing this many seconds between batches.
+ORDER_ARCHIVE_AFTER_DAYS = config("ORDER_ARCHIVE_AFTER_DAYS", default=365, cast=int)
+ORDER_ARCHIVE_BATCH_SIZE = config("ORDER_ARCHIVE_BATCH_SIZE", default=1000, cast=int)
+ORDER_ARCHIVE_SLEEP = config("ORDER_ARCHIVE_SLEEP", default=0.5, cast=float)
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_REFRESH_SERIALIZER": "orders.serializers.TokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "orders.serializers.TokenBlacklistSerializer",
 }
+
+# Verified JWTs kept in memory per process, see orders.authentication.
+VERIFIED_TOKEN_CACHE_SIZE = config("VERIFIED_TOKEN_CACHE_SIZE", default=10000, cast=int)
+
+# Seconds between full reloads of the per-process refresh token blacklist
+# index (orders/blacklist.py). The index is only used with a shared cache.
+TOKEN_BLACKLIST_RESYNC_SECONDS = config(
+    "TOKEN_BLACKLIST_RESYNC_SECONDS", default=60, cast=int
+)
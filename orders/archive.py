@@ -0,0 +1,94 @@
+"""
+Batched archival of old orders into ``ArchivedOrder``.
+
+``archive_orders`` moves orders placed before a cutoff a batch at a time:
+each batch is the next ``batch_size`` ids in primary key order, copied with
+one ``INSERT ... SELECT`` and removed with one ``DELETE`` over the same id
+range, in a transaction of its own. Locks are held only for that batch, so
+the command can run while orders are being placed; it sleeps between
+batches to leave the database some headroom.
+
+Archived orders keep their ids and are not cancellations: they get no
+tombstone and sales rollups still count them.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order
+
+COLUMNS = ("id", "user_id", "menu_item_id", "quantity", "ordered_at", "total_amount")
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable(cutoff):
+    return Order.objects.filter(ordered_at__lt=cutoff)
+
+
+def _next_range(cutoff, after, batch_size, using):
+    ids = list(
+        archivable(cutoff)
+        .using(using)
+        .filter(id__gt=after)
+        .order_by("id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    return (after, ids[-1]) if ids else None
+
+
+def archive_batch(cutoff, after=0, batch_size=None):
+    """
+    Move the next batch of orders placed before ``cutoff`` with ids above
+    ``after``; return ``(moved, last_id)``, or ``(0, None)`` when done.
+    """
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    using = router.db_for_write(Order)
+    bounds = _next_range(cutoff, after, batch_size, using)
+    if bounds is None:
+        return 0, None
+    low, high = bounds
+    batch = archivable(cutoff).using(using).filter(id__gt=low, id__lte=high)
+
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    query = batch.values_list(*COLUMNS).query
+    select, params = query.get_compiler(using).as_sql()
+    insert = (
+        f"INSERT INTO {quote(ArchivedOrder._meta.db_table)} "
+        f"({', '.join(quote(column) for column in COLUMNS)}) {select}"
+    )
+    with transaction.atomic(using=using):
+        # Lock the batch first, so an order cancelled meanwhile is either
+        # gone before the copy or waits and then finds nothing to cancel.
+        list(batch.select_for_update().values_list("id", flat=True))
+        with connection.cursor() as cursor:
+            cursor.execute(insert, params)
+        # The range and cutoff match the SELECT, so exactly the copied rows go.
+        moved = batch._raw_delete(using)
+    return moved, high
+
+
+def archive_orders(cutoff, batch_size=None, pause=0, log=None):
+    """
+    Archive every order placed before ``cutoff``, sleeping ``pause`` seconds
+    between batches; return how many were moved.
+    """
+    total, after = 0, 0
+    while True:
+        moved, after = archive_batch(cutoff, after, batch_size)
+        if after is None:
+            return total
+        total += moved
+        if log:
+            log(f"Archived {total} orders (through id {after})")
+        if pause:
+            time.sleep(pause)
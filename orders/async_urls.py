@@ -0,0 +1,12 @@
+from django.urls import path
+
+from .async_views import browse_menu, get_user_orders, login, signup
+
+# Async replacements served by the ASGI application. Anything not listed here
+# falls through to the regular routes in orders/urls.py.
+urlpatterns = [
+    path("signup/", signup, name="signup"),
+    path("login/", login, name="login"),
+    path("menu/", browse_menu, name="browse_menu"),
+    path("user_orders/", get_user_orders, name="get_user_orders"),
+]
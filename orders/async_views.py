@@ -0,0 +1,152 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import check_password, make_password
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .cache import aget_menu_payload, aget_menu_version, etag_matches, menu_etag
+from .decorators import require_auth_async, throttle_async, use_replica
+from .hashing import run_in_hashing_pool
+from .models import Order, User
+from .pagination import apaginated_response
+from .projections import order_projection
+from .renderers import json_response
+from .search import is_search, menu_index, parse_search
+from .serializers import UserSerializer
+from .sync import (
+    ExpiredSyncToken,
+    InvalidSyncToken,
+    aorder_changes,
+    areplica_token,
+    parse_sync_token,
+    sync_token,
+)
+from .throttling import LoginThrottle, SignupThrottle
+from .views import login_payload
+
+
+def _request_data(request):
+    if request.content_type == "application/json":
+        return json.loads(request.body or b"{}")
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+@throttle_async(SignupThrottle)
+async def signup(request):
+    try:
+        serializer = UserSerializer(data=_request_data(request))
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(
+                {"status": "error", "message": serializer.errors}, status=400
+            )
+
+        validated_data = dict(serializer.validated_data)
+        validated_data["password"] = await run_in_hashing_pool(
+            make_password, validated_data["password"]
+        )
+        user = await User.objects.acreate(**validated_data)
+        return JsonResponse(
+            {
+                "status": "success",
+                "message": "User created successfully",
+                "data": UserSerializer(user).data,
+            },
+            status=201,
+        )
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+
+@csrf_exempt
+@require_POST
+@throttle_async(LoginThrottle)
+async def login(request):
+    try:
+        data = _request_data(request)
+        username = data.get("username")
+        password = data.get("password")
+
+        user = None
+        if username is not None and password is not None:
+            user = await User.objects.filter(username=username).afirst()
+            if user is None:
+                # Hash anyway so unknown usernames take as long as wrong
+                # passwords, like ModelBackend does.
+                await run_in_hashing_pool(make_password, password)
+            elif not (
+                user.is_active
+                and await run_in_hashing_pool(check_password, password, user.password)
+            ):
+                user = None
+
+        if user is None:
+            return JsonResponse(
+                {"status": "error", "message": "Invalid credentials"}, status=401
+            )
+
+        return JsonResponse(await sync_to_async(login_payload)(user), status=200)
+
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+
+@require_GET
+@require_auth_async
+async def browse_menu(request):
+    version = await aget_menu_version()
+    etag = menu_etag(version)
+
+    if etag_matches(request.headers.get("If-None-Match", ""), etag):
+        response = HttpResponseNotModified()
+    else:
+        version, data = await aget_menu_payload(version)
+        if is_search(request.GET):
+            try:
+                search = parse_search(request.GET)
+            except ValueError as e:
+                return json_response({"status": "error", "message": str(e)}, 400)
+            data = await menu_index.asearch(version, data, **search)
+        response = json_response({"status": "success", "data": data})
+
+    response["ETag"] = etag
+    return response
+
+
+@require_GET
+@require_auth_async
+@use_replica
+async def get_user_orders(request):
+    token = sync_token()
+    since = request.GET.get("since")
+    if since:
+        try:
+            changes = await aorder_changes(
+                request.user_id, parse_sync_token(since), order_projection
+            )
+        except ExpiredSyncToken:
+            return JsonResponse(
+                {
+                    "status": "error",
+                    "message": "Sync token expired, fetch the full order history",
+                },
+                status=410,
+            )
+        except InvalidSyncToken:
+            return JsonResponse(
+                {"status": "error", "message": "Invalid sync token"}, status=400
+            )
+        return json_response({"status": "success", **changes, "sync_token": token})
+
+    orders = Order.objects.filter(user_id=request.user_id)
+    token = await areplica_token(orders) or token
+    return await apaginated_response(
+        request,
+        orders,
+        ("-ordered_at", "-id"),
+        order_projection,
+        extra={"sync_token": token},
+    )
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens whose signature and claims were already verified.
+
+    Entries are dropped once the token's ``exp`` has passed, so a hit is
+    exactly as trustworthy as re-verifying the token would have been.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_class, raw_token):
+        key = (token_class, raw_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, token_class, raw_token, token):
+        key = (token_class, raw_token)
+        with self._lock:
+            self._entries[key] = (token, token["exp"])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(
+    maxsize=getattr(settings, "VERIFIED_TOKEN_CACHE_SIZE", 10000)
+)
+
+
+def validate_token(raw_token, token_class):
+    """
+    Return a verified ``token_class`` for ``raw_token``, verifying it at most
+    once per process. Raises ``TokenError`` for invalid or expired tokens.
+    """
+    token = verified_tokens.get(token_class, raw_token)
+    if token is None:
+        token = token_class(raw_token)
+        verified_tokens.set(token_class, raw_token, token)
+    elif hasattr(token, "check_blacklist"):
+        # Revocation can happen after the first verification.
+        token.check_blacklist()
+    return token
+
+
+class CachedJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticates the bearer access token without loading the ``User`` row.
+
+    The user is a ``TokenUser`` backed by the token claims (``user_id``,
+    ``is_admin``), and verified tokens are remembered until they expire.
+    """
+
+    def get_validated_token(self, raw_token):
+        for token_class in api_settings.AUTH_TOKEN_CLASSES:
+            token = verified_tokens.get(token_class, raw_token)
+            if token is not None:
+                return token
+
+        token = super().get_validated_token(raw_token)
+        verified_tokens.set(type(token), raw_token, token)
+        return token
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .cache import cache_is_shared
+
+GENERATION_KEY = "token_blacklist:generation"
+# Ids below the high-water mark re-read on each sync, for rows whose
+# transaction committed after one with a higher id.
+RESYNC_WINDOW = 1000
+
+
+class BlacklistIndex:
+    """
+    Process-local set of blacklisted refresh token JTIs.
+
+    A JTI missing from the set is known not to be revoked, so most checks
+    never touch the database. Every ``BlacklistedToken`` save bumps a
+    generation counter in the shared cache once it commits; when it moves we
+    pull the rows added since our last load, and the whole table is reloaded
+    every ``TOKEN_BLACKLIST_RESYNC_SECONDS`` to catch anything missed. With a
+    per-process cache the counter cannot be shared, so every check goes to
+    the database.
+    """
+
+    def __init__(self):
+        self._jtis = set()
+        self._last_id = 0
+        self._generation = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _current_generation(self):
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            generation = int(time.time() * 1000)
+            if not cache.add(GENERATION_KEY, generation, timeout=None):
+                generation = cache.get(GENERATION_KEY, generation)
+        return generation
+
+    def _expired(self):
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at
+            > settings.TOKEN_BLACKLIST_RESYNC_SECONDS
+        )
+
+    def _sync(self):
+        generation = self._current_generation()
+        if generation == self._generation and not self._expired():
+            return
+        with self._lock:
+            expired = self._expired()
+            if generation == self._generation and not expired:
+                return
+            if expired:
+                jtis, last_id, since = set(), 0, 0
+            else:
+                jtis, last_id = self._jtis, self._last_id
+                since = max(0, last_id - RESYNC_WINDOW)
+            rows = BlacklistedToken.objects.filter(id__gt=since).values_list(
+                "id", "token__jti"
+            )
+            for row_id, jti in rows:
+                jtis.add(jti)
+                last_id = max(last_id, row_id)
+            self._jtis, self._last_id = jtis, last_id
+            self._generation = generation
+            if expired:
+                self._loaded_at = time.monotonic()
+
+    def might_contain(self, jti):
+        if not cache_is_shared():
+            return True
+        self._sync()
+        return jti in self._jtis
+
+    def add(self, jti):
+        with self._lock:
+            self._jtis.add(jti)
+
+    def announce(self):
+        """Tell every process to reload; call once a blacklisting commits."""
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            self._current_generation()
+
+    def reset(self):
+        with self._lock:
+            self._jtis.clear()
+            self._last_id = 0
+            self._generation = None
+            self._loaded_at = None
+
+
+blacklist_index = BlacklistIndex()
+
+
+def is_blacklisted(jti):
+    if not blacklist_index.might_contain(jti):
+        return False
+    # Probable hit: the set can hold rows since flushed, so let the table decide.
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
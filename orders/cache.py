@@ -0,0 +1,109 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.http import parse_etags
+
+from .models import MenuItem
+from .projections import menu_item_projection
+
+MENU_VERSION_KEY = "menu:version"
+MENU_PAYLOAD_KEY = "menu:payload:{version}"
+
+# Process-local copy of the last payload we served, so a warm worker only
+# pays one shared-cache lookup (the version) per request.
+_local = {"version": None, "data": None}
+
+
+def cache_is_shared():
+    """
+    Whether the default cache is seen by every server process. ``locmem``
+    and ``dummy`` are per process, so state kept in them cannot coordinate
+    workers.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def _timeout():
+    return getattr(settings, "MENU_CACHE_TIMEOUT", 60 * 60)
+
+
+def _version_timeout():
+    # A per-process cache cannot carry another worker's bump, so the version
+    # is only trusted for MENU_VERSION_LOCAL_TIMEOUT seconds; then it is
+    # re-seeded and the menu reloaded from the database.
+    if cache_is_shared():
+        return None
+    return settings.MENU_VERSION_LOCAL_TIMEOUT
+
+
+def _initial_version():
+    # Seed from the clock so a version key lost to eviction or a cache flush
+    # never restarts at a number some worker still holds a payload for.
+    return int(time.time() * 1000)
+
+
+def get_menu_version():
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        version = _initial_version()
+        if not cache.add(MENU_VERSION_KEY, version, timeout=_version_timeout()):
+            version = cache.get(MENU_VERSION_KEY, version)
+    return version
+
+
+async def aget_menu_version():
+    version = await cache.aget(MENU_VERSION_KEY)
+    if version is None:
+        version = _initial_version()
+        if not await cache.aadd(MENU_VERSION_KEY, version, timeout=_version_timeout()):
+            version = await cache.aget(MENU_VERSION_KEY, version)
+    return version
+
+
+def bump_menu_version():
+    try:
+        return cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        cache.add(MENU_VERSION_KEY, _initial_version(), timeout=_version_timeout())
+        return cache.get(MENU_VERSION_KEY)
+
+
+def menu_etag(version):
+    return f'"menu-{version}"'
+
+
+def etag_matches(if_none_match, etag):
+    # Weak comparison: compression middleware hands out W/"menu-<version>".
+    return etag in {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+
+
+def get_menu_payload(version=None):
+    """Return ``(version, data)`` for the serialized menu."""
+    if version is None:
+        version = get_menu_version()
+
+    if _local["version"] == version:
+        return version, _local["data"]
+
+    key = MENU_PAYLOAD_KEY.format(version=version)
+    data = cache.get(key)
+    if data is None:
+        # Read from the primary: a lagging replica would cache a stale menu
+        # under the new version until the next change.
+        rows = menu_item_projection.values(MenuItem.objects.using("default"))
+        data = menu_item_projection.render(rows)
+        cache.set(key, data, timeout=_timeout())
+
+    _local["version"] = version
+    _local["data"] = data
+    return version, data
+
+
+async def aget_menu_payload(version):
+    if _local["version"] == version:
+        return version, _local["data"]
+    return await sync_to_async(get_menu_payload)(version)
@@ -0,0 +1,89 @@
+from django.db import connections, router
+from django.db.models import Subquery
+from django.db.models.sql import DeleteQuery
+
+from .models import Order
+from .outbox import ORDER_CANCELLED, publish
+from .rollups import record_cancellations
+from .sync import record_tombstones
+
+# Columns handed back by the DELETE: enough to refund the order and to take
+# it out of the sales rollups.
+RETURNED_FIELDS = ("id", "user", "menu_item", "quantity", "ordered_at", "total_amount")
+
+
+def _supports_delete_returning(connection):
+    # MySQL has no RETURNING; MariaDB does, but like MySQL it rejects the
+    # LIMIT subquery used for single cancellations, so both take the fallback.
+    if connection.vendor == "postgresql":
+        return True
+    return (
+        connection.vendor == "sqlite"
+        and connection.features.can_return_columns_from_insert
+    )
+
+
+def _converters(connection, fields):
+    converters = []
+    for index, field in enumerate(fields):
+        column = field.get_col(Order._meta.db_table)
+        functions = connection.ops.get_db_converters(column)
+        functions += column.get_db_converters(connection)
+        if functions:
+            converters.append((index, column, functions))
+    return converters
+
+
+def _delete_returning(connection, queryset, fields):
+    query = queryset.query.chain(DeleteQuery)
+    sql, params = query.get_compiler(connection=connection).as_sql()
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {columns}", params)
+        rows = [list(row) for row in cursor.fetchall()]
+
+    for index, column, functions in _converters(connection, fields):
+        for row in rows:
+            value = row[index]
+            for function in functions:
+                value = function(value, column, connection)
+            row[index] = value
+    return rows
+
+
+def cancel_orders(queryset, limit=None):
+    """
+    Delete the orders in ``queryset`` (the first ``limit`` of them in its
+    ordering, if given) and return them as unsaved ``Order`` instances.
+
+    On PostgreSQL and SQLite this is a single ``DELETE ... RETURNING``; other
+    backends lock the rows with ``SELECT ... FOR UPDATE`` and delete them by
+    primary key. Either way ``Order`` has no dependents, so Django's deletion
+    collector is skipped. The sales rollups are updated to match, and a
+    tombstone and an ``order.cancelled`` event are written per order. Must
+    run inside ``transaction.atomic()``.
+    """
+    using = router.db_for_write(Order)
+    connection = connections[using]
+    fields = [Order._meta.get_field(name) for name in RETURNED_FIELDS]
+    attnames = [field.attname for field in fields]
+
+    if _supports_delete_returning(connection):
+        if limit is not None:
+            queryset = Order.objects.filter(
+                pk__in=Subquery(queryset.values("pk")[:limit])
+            )
+        rows = _delete_returning(connection, queryset, fields)
+    else:
+        locked = queryset.using(using).select_for_update()
+        if limit is not None:
+            locked = locked[:limit]
+        rows = list(locked.values_list(*attnames))
+        if rows:
+            Order.objects.filter(pk__in=[row[0] for row in rows])._raw_delete(using)
+
+    orders = [Order(**dict(zip(attnames, row))) for row in rows]
+    record_cancellations(orders)
+    record_tombstones(orders)
+    publish(ORDER_CANCELLED, orders)
+    return orders
@@ -1,7 +1,28 @@
+import hashlib
+import json
+import math
+import time
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from food_ordering_api.routers import ais_pinned, is_pinned, pin_primary, replica_reads
+
+from .authentication import CachedJWTAuthentication, validate_token
+from .tokens import RefreshToken
+
+
+def _user_pk(value):
+    # Token claims carry the id as a string; views compare and store it as
+    # the primary key type.
+    return get_user_model()._meta.pk.to_python(value)
 
 
 def require_auth(view_func):
@@ -18,7 +39,7 @@ def require_auth(view_func):
             and request.user is not None
             and hasattr(request.user, "id")
         ):
-            request.user_id = request.user.id
+            request.user_id = _user_pk(request.user.id)
             request.is_admin = getattr(request.user, "is_admin", False)
             return view_func(request, *args, **kwargs)
 
@@ -31,8 +52,8 @@ def require_auth(view_func):
             )
 
         try:
-            token = RefreshToken(refresh_token)
-            request.user_id = token["user_id"]
+            token = validate_token(refresh_token, RefreshToken)
+            request.user_id = _user_pk(token["user_id"])
             request.is_admin = token["is_admin"]
             return view_func(request, *args, **kwargs)
         except Exception:
@@ -42,3 +63,220 @@ def require_auth(view_func):
             )
 
     return wrapper
+
+
+def require_auth_async(view_func):
+    """
+    ``require_auth`` for native async views, which bypass DRF authentication.
+
+    Bearer tokens are checked with ``CachedJWTAuthentication`` and never touch
+    the database; like the DRF views, requests without credentials go through
+    as anonymous.
+    """
+    authenticator = CachedJWTAuthentication()
+
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        request.user_id = None
+        request.is_admin = False
+
+        try:
+            header = authenticator.get_header(request)
+            raw_token = header and authenticator.get_raw_token(header)
+            if raw_token:
+                token = authenticator.get_validated_token(raw_token)
+                request.user_id = _user_pk(token["user_id"])
+                request.is_admin = token.get("is_admin", False)
+            elif request.COOKIES.get("refresh_token"):
+                token = await sync_to_async(validate_token)(
+                    request.COOKIES["refresh_token"], RefreshToken
+                )
+                request.user_id = _user_pk(token["user_id"])
+                request.is_admin = token["is_admin"]
+        except (AuthenticationFailed, InvalidToken, TokenError, KeyError):
+            return JsonResponse(
+                {"status": "error", "message": "Invalid or expired token"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _idempotency_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{request.method} {request.path}\n{payload}".encode()
+    ).hexdigest()
+
+
+def idempotent(view_func):
+    """
+    Replay the stored response for a repeated ``Idempotency-Key`` header.
+
+    The first response for a ``(user, key)`` pair is cached for
+    ``IDEMPOTENCY_KEY_TTL`` seconds; retries get it back with an
+    ``Idempotent-Replayed: true`` header and the view does not run again.
+    A duplicate that arrives while the first request is still running waits
+    for its result instead of writing a second time. Reusing a key for a
+    different request body is rejected with 422. Place it under
+    ``require_auth`` so ``request.user_id`` is set.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view_func(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {"status": "error", "message": "Idempotency-Key is too long"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        cache_key = f"idempotency:{request.user_id}:{digest}"
+        lock_key = f"{cache_key}:lock"
+        fingerprint = _idempotency_fingerprint(request)
+
+        stored = cache.get(cache_key)
+        if stored is None and cache.add(
+            lock_key, True, settings.IDEMPOTENCY_LOCK_TIMEOUT
+        ):
+            # The first request may have stored its response and released the
+            # lock between our read and our add; look again before writing.
+            stored = cache.get(cache_key)
+            if stored is not None:
+                cache.delete(lock_key)
+        elif stored is None:
+            # Another request with this key is being processed; wait for it.
+            deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_TIMEOUT
+            while stored is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+                stored = cache.get(cache_key)
+            if stored is None:
+                return Response(
+                    {
+                        "status": "error",
+                        "message": "A request with this Idempotency-Key is in progress",
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+        if stored is not None:
+            if stored["fingerprint"] != fingerprint:
+                return Response(
+                    {
+                        "status": "error",
+                        "message": "Idempotency-Key was used for a different request",
+                    },
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            return Response(
+                stored["data"],
+                status=stored["status"],
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        try:
+            response = view_func(request, *args, **kwargs)
+            if response.status_code < 500:
+                cache.set(
+                    cache_key,
+                    {
+                        "fingerprint": fingerprint,
+                        "status": response.status_code,
+                        "data": response.data,
+                    },
+                    settings.IDEMPOTENCY_KEY_TTL,
+                )
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
+
+
+def throttle_async(*throttle_classes):
+    """
+    Apply DRF throttle classes to a native async view, which bypasses DRF.
+
+    Rejected requests get the same 429 and ``Retry-After`` as the DRF views.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            waits = []
+            for throttle_class in throttle_classes:
+                throttle = throttle_class()
+                # Cache backends other than locmem do network I/O here.
+                allowed = await sync_to_async(
+                    throttle.allow_request, thread_sensitive=False
+                )(request, None)
+                if not allowed:
+                    waits.append(throttle.wait() or 0)
+            if waits:
+                wait = math.ceil(max(waits))
+                response = JsonResponse(
+                    {
+                        "detail": "Request was throttled. "
+                        f"Expected available in {wait} seconds."
+                    },
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                )
+                response["Retry-After"] = str(wait)
+                return response
+            return await view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def use_replica(view_func):
+    """
+    Serve safe-method requests from the read replica.
+
+    A successful write through a decorated view pins its user to the primary
+    for ``REPLICA_STICKY_SECONDS``, so they read their own writes despite
+    replication lag. Place it under ``require_auth`` (or
+    ``require_auth_async``) so ``request.user_id`` is set; works on sync and
+    async views.
+    """
+
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user_id = getattr(request, "user_id", None)
+            if request.method not in SAFE_METHODS:
+                response = await view_func(request, *args, **kwargs)
+                if response.status_code < 400:
+                    await sync_to_async(pin_primary)(user_id)
+                return response
+            if await ais_pinned(user_id):
+                return await view_func(request, *args, **kwargs)
+            with replica_reads():
+                return await view_func(request, *args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        user_id = getattr(request, "user_id", None)
+        if request.method not in SAFE_METHODS:
+            response = view_func(request, *args, **kwargs)
+            if response.status_code < 400:
+                pin_primary(user_id)
+            return response
+        if is_pinned(user_id):
+            return view_func(request, *args, **kwargs)
+        with replica_reads():
+            return view_func(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,31 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Shared pool for password hashing under ASGI.
+
+    PBKDF2 (the default hasher) releases the GIL while it runs, so a small
+    thread pool keeps hashing off the event loop without forking processes.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "PASSWORD_HASHING_WORKERS", 4),
+                    thread_name_prefix="password-hashing",
+                )
+    return _executor
+
+
+async def run_in_hashing_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), func, *args)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.archive import archivable, archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Move orders older than ORDER_ARCHIVE_AFTER_DAYS into the archive "
+        "table in primary key batches, one short transaction per batch, "
+        "sleeping between batches. Safe to run while orders are placed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=settings.ORDER_ARCHIVE_SLEEP,
+            help="Seconds to pause between batches.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the orders that would be archived.",
+        )
+
+    def handle(self, *args, days, batch_size, sleep, dry_run, **options):
+        cutoff = archive_cutoff(days)
+        if dry_run:
+            count = archivable(cutoff).count()
+            self.stdout.write(f"{count} orders placed before {cutoff:%Y-%m-%d}")
+            return
+        moved = archive_orders(cutoff, batch_size, sleep, log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} orders"))
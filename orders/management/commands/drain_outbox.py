@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.outbox import drain, load_sinks, purge_delivered
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver order events from the outbox to the sinks in OUTBOX_SINKS, "
+        "sinks in parallel, retrying failures with backoff. Runs until "
+        "interrupted; several workers can run at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once nothing is due."
+        )
+
+    def handle(self, *args, batch_size, threads, poll_interval, once, **options):
+        sinks = load_sinks()
+        retention = timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        delivered = 0
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            try:
+                while True:
+                    count = drain(sinks, executor, batch_size)
+                    delivered += count
+                    if count:
+                        continue
+                    purge_delivered(retention)
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {delivered} events"))
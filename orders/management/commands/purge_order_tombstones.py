@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete order tombstones older than ORDER_TOMBSTONE_RETENTION_DAYS. "
+        "Sync tokens older than that already get a 410, so nothing reads them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.ORDER_TOMBSTONE_RETENTION_DAYS
+        )
+
+    def handle(self, *args, days, **options):
+        deleted = purge_tombstones(timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones"))
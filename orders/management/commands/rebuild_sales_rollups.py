@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncDay, TruncHour
+
+from orders.models import ArchivedOrder, Order, SalesRollup, SalesRollupStaging
+from orders.rollups import apply_deltas
+
+TRUNCATE = {SalesRollup.HOUR: TruncHour, SalesRollup.DAY: TruncDay}
+COLUMNS = ("menu_item_id", "granularity", "bucket", "quantity", "revenue")
+
+
+def add_orders(deltas, orders):
+    """Add the rollup deltas of ``orders`` to ``deltas``, grouped in the database."""
+    for granularity, truncate in TRUNCATE.items():
+        rows = (
+            orders.annotate(bucket=truncate("ordered_at"))
+            .values("menu_item_id", "bucket")
+            .annotate(quantity=Sum("quantity"), revenue=Sum("total_amount"))
+        )
+        for row in rows:
+            key = (row["menu_item_id"], granularity, row["bucket"])
+            quantity, revenue = deltas.get(key, (0, Decimal(0)))
+            deltas[key] = (
+                quantity + row["quantity"],
+                revenue + Decimal(row["revenue"]),
+            )
+
+
+def swap_in_staging():
+    """Replace the rollups with the staged ones: one ``INSERT ... SELECT``."""
+    using = router.db_for_write(SalesRollup)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    query = SalesRollupStaging.objects.values_list(*COLUMNS).query
+    select, params = query.get_compiler(using).as_sql()
+    SalesRollup.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(SalesRollup._meta.db_table)} "
+            f"({', '.join(quote(column) for column in COLUMNS)}) {select}",
+            params,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the sales rollup table from scratch, aggregating orders in "
+        "primary key batches into a staging table, then swap the totals in "
+        "with one transaction. Archived orders are included. Orders placed "
+        "while it runs are counted; avoid cancelling or archiving orders "
+        "until it finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, batch_size, **options):
+        # Left over from an interrupted run.
+        SalesRollupStaging.objects.all().delete()
+        # Archived orders still count; see orders.archive.
+        for model in (ArchivedOrder, Order):
+            upper = model.objects.aggregate(last=Max("id"))["last"] or 0
+            low = 0
+            while low < upper:
+                high = min(low + batch_size, upper)
+                # Each batch is flushed, so memory stays at one batch's buckets.
+                deltas = {}
+                add_orders(deltas, model.objects.filter(id__gt=low, id__lte=high))
+                apply_deltas(deltas, SalesRollupStaging)
+                low = high
+                name = model._meta.verbose_name_plural
+                self.stdout.write(f"Rolled up {name} {low}/{upper}")
+
+        with transaction.atomic():
+            # The report never sees an empty or partial table. Orders that
+            # committed after ``upper`` was read were counted incrementally
+            # in the rows being replaced, so they are counted again here.
+            swap_in_staging()
+            deltas = {}
+            add_orders(deltas, Order.objects.filter(id__gt=upper))
+            apply_deltas(deltas)
+            SalesRollupStaging.objects.all().delete()
+
+        self.stdout.write(self.style.SUCCESS("Sales rollups rebuilt"))
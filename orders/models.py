@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models.functions import Now
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 from food_ordering_api import settings
 
@@ -20,6 +22,9 @@ class MenuItem(models.Model):
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=6, decimal_places=2)
 
+    class Meta:
+        indexes = [models.Index(fields=["price"], name="menuitem_price_idx")]
+
     def __str__(self):
         return self.name
 
@@ -30,7 +35,147 @@ class Order(models.Model):
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     ordered_at = models.DateTimeField(auto_now_add=True)
-    total_amount = models.IntegerField(default=1)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Drives delta sync of a user's order history; see orders.sync.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "ordered_at"], name="order_user_ordered_at_idx"
+            ),
+            models.Index(
+                fields=["user", "updated_at"], name="order_user_updated_at_idx"
+            ),
+            models.Index(fields=["menu_item", "user"], name="order_item_user_idx"),
+            models.Index(fields=["ordered_at"], name="order_ordered_at_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.menu_item.name}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    An order older than ORDER_ARCHIVE_AFTER_DAYS, moved out of ``Order`` by
+    the ``archive_orders`` command with its id unchanged; see
+    ``orders.archive``.
+    """
+
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    ordered_at = models.DateTimeField()
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    archived_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "ordered_at"], name="archived_user_ordered_at_idx"
+            ),
+            models.Index(fields=["ordered_at"], name="archived_ordered_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"archived order {self.id}"
+
+
+class OrderTombstone(models.Model):
+    """
+    An order removed by a cancellation or menu item deletion, kept so delta
+    syncs can tell clients to drop it; see ``orders.sync``.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    order_id = models.IntegerField()
+    # Not a foreign key: tombstones must not block or cascade user deletion,
+    # and are purged after ORDER_TOMBSTONE_RETENTION_DAYS anyway.
+    user_id = models.IntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user_id", "deleted_at"], name="tombstone_user_deleted_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"order {self.order_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class SalesRollup(models.Model):
+    HOUR = "hour"
+    DAY = "day"
+    GRANULARITY_CHOICES = [(HOUR, "Hour"), (DAY, "Day")]
+
+    id = models.AutoField(primary_key=True)
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "bucket", "menu_item"],
+                name="sales_rollup_bucket_uniq",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item_id} - {self.granularity} {self.bucket:%Y-%m-%d %H:00}"
+
+
+class SalesRollupStaging(models.Model):
+    """
+    Totals being rebuilt by ``rebuild_sales_rollups``, swapped into
+    ``SalesRollup`` when complete; empty otherwise.
+    """
+
+    id = models.AutoField(primary_key=True)
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="+")
+    granularity = models.CharField(
+        max_length=4, choices=SalesRollup.GRANULARITY_CHOICES
+    )
+    bucket = models.DateTimeField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "bucket", "menu_item"],
+                name="sales_rollup_staging_bucket_uniq",
+            )
+        ]
+
+
+class OutboxEvent(models.Model):
+    """
+    An order event waiting to be delivered to the configured sinks, written in
+    the same transaction as the order change; see ``orders.outbox``.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    delivered_to = models.JSONField(default=list)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["delivered_at", "available_at"], name="outbox_pending_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.topic}"
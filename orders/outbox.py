@@ -0,0 +1,170 @@
+"""
+Transactional outbox for order events.
+
+Views call ``publish`` inside the transaction that changes the orders, so an
+event row exists exactly when the change commits, and the request pays for
+one INSERT however many consumers there are. The ``drain_outbox`` command
+delivers pending events to every sink in ``settings.OUTBOX_SINKS`` and
+records which sinks have each event; a failed sink is retried with
+exponential backoff until ``OUTBOX_MAX_ATTEMPTS``. Delivery is at least once:
+a sink can see an event again if the worker dies before recording it, so
+sinks should deduplicate on the event ``id``.
+"""
+
+import json
+import logging
+import random
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+from .projections import order_projection
+
+ORDER_PLACED = "order.placed"
+ORDER_CANCELLED = "order.cancelled"
+
+logger = logging.getLogger("orders.outbox")
+
+
+def publish(topic, orders):
+    """Queue one ``topic`` event per order; call inside the order's transaction."""
+    OutboxEvent.objects.bulk_create(
+        OutboxEvent(topic=topic, payload=payload)
+        for payload in order_projection.render_objects(orders)
+    )
+
+
+def as_message(event):
+    return {
+        "id": event.id,
+        "topic": event.topic,
+        "created_at": event.created_at.isoformat(),
+        "payload": event.payload,
+    }
+
+
+class LoggingSink:
+    """Log each event as a JSON line on the ``orders.outbox`` logger."""
+
+    def send(self, messages):
+        for message in messages:
+            logger.info(json.dumps(message))
+
+
+class FileSink:
+    """Append events to ``path`` as NDJSON."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def send(self, messages):
+        lines = "".join(json.dumps(message) + "\n" for message in messages)
+        with self._lock, self.path.open("a") as file:
+            file.write(lines)
+
+
+class MemorySink:
+    """Keep delivered events in ``messages``; for tests."""
+
+    def __init__(self, fail=0):
+        self.messages = []
+        # Raise on the next ``fail`` calls, to exercise retries.
+        self.fail = fail
+
+    def send(self, messages):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("sink unavailable")
+        self.messages.extend(messages)
+
+
+def load_sinks(config=None):
+    """Instantiate ``{name: sink}`` from ``settings.OUTBOX_SINKS``."""
+    config = settings.OUTBOX_SINKS if config is None else config
+    return {
+        name: import_string(options["BACKEND"])(**options.get("OPTIONS", {}))
+        for name, options in config.items()
+    }
+
+
+def backoff(attempts):
+    """Seconds before attempt ``attempts + 1``: doubling, capped, with jitter."""
+    delay = min(
+        settings.OUTBOX_MAX_BACKOFF, settings.OUTBOX_BACKOFF * 2 ** (attempts - 1)
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def _claim(batch_size):
+    # Lease the batch by pushing ``available_at`` past the delivery, so other
+    # workers skip it without a lock being held while sinks run. If this
+    # worker dies the lease lapses and the events are retried.
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(
+                delivered_at__isnull=True,
+                available_at__lte=now,
+                attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+            )
+            .order_by("id")[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(pk__in=[event.id for event in events]).update(
+                available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            )
+    return events
+
+
+def drain(sinks, executor, batch_size=None):
+    """
+    Deliver one batch of pending events to ``sinks``, each sink in its own
+    ``executor`` thread, and return how many events were claimed.
+    """
+    events = _claim(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not events:
+        return 0
+
+    futures = {}
+    for name, sink in sinks.items():
+        messages = [as_message(e) for e in events if name not in e.delivered_to]
+        if messages:
+            futures[name] = executor.submit(sink.send, messages)
+
+    errors = {}
+    for name, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            errors[name] = f"{name}: {e!r}"
+            logger.warning("Outbox sink %s failed: %r", name, e)
+
+    now = timezone.now()
+    delivered = futures.keys() - errors.keys()
+    for event in events:
+        event.delivered_to = sorted(set(event.delivered_to) | delivered)
+        if sinks.keys() <= set(event.delivered_to):
+            event.delivered_at = now
+        else:
+            event.attempts += 1
+            event.available_at = now + timedelta(seconds=backoff(event.attempts))
+            event.last_error = "\n".join(errors.values())
+    OutboxEvent.objects.bulk_update(
+        events,
+        ["delivered_to", "delivered_at", "available_at", "attempts", "last_error"],
+    )
+    return len(events)
+
+
+def purge_delivered(older_than):
+    """Delete events delivered more than ``older_than`` ago."""
+    cutoff = timezone.now() - older_than
+    return OutboxEvent.objects.filter(delivered_at__lt=cutoff).delete()[0]
@@ -0,0 +1,209 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from .renderers import json_response
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _encode_cursor(values, reverse):
+    payload = json.dumps({"k": values, "r": reverse}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return list(payload["k"]), bool(payload["r"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+
+
+def _key_value(row, field):
+    value = row[field] if isinstance(row, dict) else getattr(row, field)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a fixed ``ordering`` whose last field is unique.
+
+    Each page is fetched with a range condition on the ordering columns
+    instead of an OFFSET, so page 10,000 costs the same index seek as page 1.
+    """
+
+    def __init__(self, ordering, page_size=None):
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip("-") for field in self.ordering]
+        self.descending = [field.startswith("-") for field in self.ordering]
+        self.page_size = page_size
+
+    def get_page_size(self, params):
+        default = self.page_size or settings.REST_FRAMEWORK.get("PAGE_SIZE", 100)
+        try:
+            size = int(params.get("page_size", default))
+        except (TypeError, ValueError):
+            size = default
+        return max(1, min(size, getattr(settings, "MAX_PAGE_SIZE", 1000)))
+
+    def _seek(self, values, reverse):
+        # (a, b) > (x, y)  ==>  a >= x AND (a > x OR (a = x AND b > y))
+        condition = Q()
+        equal = Q()
+        for field, descending, value in zip(self.fields, self.descending, values):
+            lookup = "gt" if descending == reverse else "lt"
+            condition |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        first = self.fields[0]
+        bound = "gte" if self.descending[0] == reverse else "lte"
+        return Q(**{f"{first}__{bound}": values[0]}) & condition
+
+    def _ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            field if descending else f"-{field}"
+            for field, descending in zip(self.fields, self.descending)
+        )
+
+    def _page_query(self, queryset, request):
+        params = getattr(request, "query_params", request.GET)
+        page_size = self.get_page_size(params)
+        cursor = params.get("cursor")
+        reverse = False
+
+        if cursor:
+            values, reverse = _decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            try:
+                queryset = queryset.filter(self._seek(values, reverse))
+            except (ValidationError, ValueError, TypeError):
+                # Well-formed, but not values of the ordering fields.
+                raise InvalidCursor(cursor)
+
+        queryset = queryset.order_by(*self._ordering(reverse))[: page_size + 1]
+        return queryset, page_size, bool(cursor), reverse
+
+    def _page(self, rows, page_size, has_cursor, reverse):
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            first = [_key_value(rows[0], field) for field in self.fields]
+            last = [_key_value(rows[-1], field) for field in self.fields]
+            if reverse:
+                next_cursor = _encode_cursor(last, False)
+                previous_cursor = _encode_cursor(first, True) if has_more else None
+            else:
+                next_cursor = _encode_cursor(last, False) if has_more else None
+                previous_cursor = _encode_cursor(first, True) if has_cursor else None
+        return rows, next_cursor, previous_cursor
+
+    def _merge(self, pages, reverse):
+        # Each page is already in order; one stable sort per field, last
+        # field first, gives the combined order.
+        rows = [row for page in pages for row in page]
+        for field, descending in reversed(list(zip(self.fields, self.descending))):
+            rows.sort(key=lambda row: row[field], reverse=descending != reverse)
+        return rows
+
+    def paginate_queryset(self, queryset, request):
+        """Return ``(rows, next_cursor, previous_cursor)`` for this request."""
+        queryset, *page = self._page_query(queryset, request)
+        return self._page(list(queryset), *page)
+
+    async def apaginate_queryset(self, queryset, request):
+        queryset, *page = self._page_query(queryset, request)
+        return self._page([row async for row in queryset], *page)
+
+    def paginate_querysets(self, querysets, request):
+        """
+        Paginate the union of ``querysets``, which must not share ordering
+        keys: each is seeked separately for a page and the pages are merged.
+        """
+        queries = [self._page_query(queryset, request) for queryset in querysets]
+        _, *page = queries[0]
+        pages = [list(queryset) for queryset, *_ in queries]
+        return self._page(self._merge(pages, page[-1]), *page)
+
+    async def apaginate_querysets(self, querysets, request):
+        queries = [self._page_query(queryset, request) for queryset in querysets]
+        _, *page = queries[0]
+        pages = [[row async for row in queryset] for queryset, *_ in queries]
+        return self._page(self._merge(pages, page[-1]), *page)
+
+
+def paginated_response(request, queryset, ordering, projection, extra=None):
+    """
+    One page of ``queryset`` rendered by ``projection``. A list of querysets
+    is paginated as their union; see ``KeysetPaginator.paginate_querysets``.
+    """
+    paginator = KeysetPaginator(ordering)
+    try:
+        if isinstance(queryset, (list, tuple)):
+            rows, next_cursor, previous_cursor = paginator.paginate_querysets(
+                [projection.values(each) for each in queryset], request
+            )
+        else:
+            rows, next_cursor, previous_cursor = paginator.paginate_queryset(
+                projection.values(queryset), request
+            )
+    except InvalidCursor:
+        return Response(
+            {"status": "error", "message": "Invalid cursor"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(
+        {
+            "status": "success",
+            "data": projection.render(rows),
+            "next": next_cursor,
+            "previous": previous_cursor,
+            **(extra or {}),
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+async def apaginated_response(request, queryset, ordering, projection, extra=None):
+    paginator = KeysetPaginator(ordering)
+    try:
+        if isinstance(queryset, (list, tuple)):
+            rows, next_cursor, previous_cursor = await paginator.apaginate_querysets(
+                [projection.values(each) for each in queryset], request
+            )
+        else:
+            rows, next_cursor, previous_cursor = await paginator.apaginate_queryset(
+                projection.values(queryset), request
+            )
+    except InvalidCursor:
+        return JsonResponse(
+            {"status": "error", "message": "Invalid cursor"}, status=400
+        )
+    return json_response(
+        {
+            "status": "success",
+            "data": projection.render(rows),
+            "next": next_cursor,
+            "previous": previous_cursor,
+            **(extra or {}),
+        },
+        status=200,
+    )
@@ -0,0 +1,150 @@
+import decimal
+
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .serializers import MenuItemSerializer, OrderSerializer, UserSerializer
+
+# Fields whose ``to_representation`` returns database values unchanged.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+)
+
+
+def _passthrough(field):
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return field.pk_field is None
+    return isinstance(field, PASSTHROUGH_FIELDS) and not isinstance(
+        field, serializers.ChoiceField
+    )
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(
+        field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    if (
+        not coerce_to_string
+        or field.localize
+        or field.normalize_output
+        or field.decimal_places is None
+    ):
+        return lambda: field.to_representation
+
+    quantum = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f"{value.quantize(quantum, rounding=rounding, context=context):f}"
+
+    return lambda: convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if (
+        output_format is None
+        or output_format.lower() != "iso-8601"
+        or hasattr(field, "timezone")
+    ):
+        return lambda: field.to_representation
+
+    def bind():
+        # The active timezone is thread/task local; resolve it once per render
+        # rather than once per row.
+        tz = field.default_timezone()
+        if tz is None:
+            return field.to_representation
+
+        def convert(value):
+            if value.utcoffset() is None:
+                return field.to_representation(value)
+            value = value.astimezone(tz).isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return convert
+
+    return bind
+
+
+class Projection:
+    """
+    Read-only, ``values()``-based twin of a ``ModelSerializer``.
+
+    The serializer's readable fields are compiled once into the model columns
+    to fetch and a converter per field (bound once per render), so rendering a
+    row is a handful of function calls instead of a full ``to_representation``
+    pass. Output is identical to ``serializer_class(instances, many=True).data``.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = None
+
+    def _compile(self):
+        serializer = self.serializer_class()
+        opts = serializer.Meta.model._meta
+        compiled = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            column = opts.get_field(field.source).attname
+            if _passthrough(field):
+                converter = None
+            elif isinstance(field, serializers.DecimalField):
+                converter = _decimal_converter(field)
+            elif isinstance(field, serializers.DateTimeField):
+                converter = _datetime_converter(field)
+            else:
+                converter = lambda field=field: field.to_representation
+            compiled.append((name, column, converter))
+        self._compiled = compiled
+        return compiled
+
+    @property
+    def fields(self):
+        return self._compiled or self._compile()
+
+    @property
+    def field_names(self):
+        return [name for name, _, _ in self.fields]
+
+    def values(self, queryset):
+        return queryset.values(*(column for _, column, _ in self.fields))
+
+    def render_objects(self, objects):
+        """Render model instances already in memory, without a query."""
+        columns = [column for _, column, _ in self.fields]
+        return self.render(
+            {column: getattr(obj, column) for column in columns} for obj in objects
+        )
+
+    def render(self, rows):
+        fields = [
+            (name, column, bind() if bind is not None else None)
+            for name, column, bind in self.fields
+        ]
+        rendered = []
+        for row in rows:
+            data = {}
+            for name, column, converter in fields:
+                value = row[column]
+                if converter is not None and value is not None:
+                    value = converter(value)
+                data[name] = value
+            rendered.append(data)
+        return rendered
+
+
+menu_item_projection = Projection(MenuItemSerializer)
+order_projection = Projection(OrderSerializer)
+user_projection = Projection(UserSerializer)
@@ -0,0 +1,124 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Order, SalesRollup
+
+GRANULARITIES = (SalesRollup.HOUR, SalesRollup.DAY)
+
+
+def bucket_for(moment, granularity):
+    moment = timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+    if granularity == SalesRollup.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+UPSERT_BATCH_SIZE = 500
+
+
+def _upsert_sql(connection, model, count):
+    table = connection.ops.quote_name(model._meta.db_table)
+    values = ", ".join(["(%s, %s, %s, %s, %s)"] * count)
+    sql = (
+        f"INSERT INTO {table} (menu_item_id, granularity, bucket, quantity, revenue) "
+        f"VALUES {values} "
+    )
+    if connection.vendor == "mysql":
+        return sql + (
+            "ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity), "
+            "revenue = revenue + VALUES(revenue)"
+        )
+    return sql + (
+        "ON CONFLICT (granularity, bucket, menu_item_id) DO UPDATE SET "
+        f"quantity = {table}.quantity + excluded.quantity, "
+        f"revenue = {table}.revenue + excluded.revenue"
+    )
+
+
+def _upsert(connection, model, deltas):
+    ops = connection.ops
+    rows = sorted(deltas.items())  # stable lock order across writers
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start : start + UPSERT_BATCH_SIZE]
+            params = []
+            for (menu_item_id, granularity, bucket), (quantity, revenue) in batch:
+                params += [
+                    menu_item_id,
+                    granularity,
+                    ops.adapt_datetimefield_value(bucket),
+                    quantity,
+                    ops.adapt_decimalfield_value(revenue, 14, 2),
+                ]
+            cursor.execute(_upsert_sql(connection, model, len(batch)), params)
+
+
+def _update_or_create(model, deltas):
+    for (menu_item_id, granularity, bucket), (quantity, revenue) in deltas.items():
+        rollup = model.objects.filter(
+            menu_item_id=menu_item_id, granularity=granularity, bucket=bucket
+        )
+        changes = {
+            "quantity": F("quantity") + quantity,
+            "revenue": F("revenue") + revenue,
+        }
+        if rollup.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(
+                    menu_item_id=menu_item_id,
+                    granularity=granularity,
+                    bucket=bucket,
+                    quantity=quantity,
+                    revenue=revenue,
+                )
+        except IntegrityError:
+            # Another request created the bucket first.
+            rollup.update(**changes)
+
+
+def apply_deltas(deltas, model=SalesRollup):
+    """
+    Add ``{(menu_item_id, granularity, bucket): (quantity, revenue)}`` to the
+    rollup table, or to ``SalesRollupStaging`` during a rebuild.
+
+    On MySQL, SQLite and PostgreSQL every bucket is incremented in place by
+    one ``INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE`` statement; other
+    backends fall back to an ``F()`` update per bucket, creating it if missing.
+    """
+    if not deltas:
+        return
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor in ("mysql", "sqlite", "postgresql"):
+        _upsert(connection, model, deltas)
+    else:
+        _update_or_create(model, deltas)
+
+
+def _deltas(orders, sign):
+    amount = Order._meta.get_field("total_amount")
+    deltas = defaultdict(lambda: (0, Decimal(0)))
+    for order in orders:
+        revenue = Decimal(amount.get_prep_value(order.total_amount))
+        for granularity in GRANULARITIES:
+            key = (
+                order.menu_item_id,
+                granularity,
+                bucket_for(order.ordered_at, granularity),
+            )
+            quantity, total = deltas[key]
+            deltas[key] = (quantity + sign * order.quantity, total + sign * revenue)
+    return deltas
+
+
+def record_orders(orders):
+    apply_deltas(_deltas(orders, 1))
+
+
+def record_cancellations(orders):
+    apply_deltas(_deltas(orders, -1))
@@ -0,0 +1,261 @@
+import bisect
+import itertools
+import threading
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+
+SORTS = ("name", "-name", "price", "-price")
+
+
+def _fold(name):
+    return name.casefold()
+
+
+def _trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _prefixes(text):
+    # Queries shorter than a trigram match the start of a word.
+    return {word[:n] for word in text.split() for n in (1, 2)}
+
+
+def _keys(text):
+    return _trigrams(text) | _prefixes(text)
+
+
+class _Snapshot:
+    """One immutable version of the index; readers never see it change."""
+
+    def __init__(self, version, records, folded, prices, postings, by_name, by_price):
+        self.version = version
+        self.records = records  # id -> rendered menu item
+        self.folded = folded  # id -> case-folded name
+        self.prices = prices  # id -> Decimal
+        self.postings = postings  # trigram or word prefix -> ids in name order
+        self.by_name = by_name  # all ids in name order
+        self.by_price = by_price  # [(price, id)], sorted
+
+    def name_key(self, pk):
+        return (self.folded[pk], pk)
+
+
+def _resorted(ordered, removed, added, old_key=None, new_key=None):
+    """
+    ``ordered`` (sorted by ``old_key``) minus ``removed`` plus ``added``,
+    sorted by ``new_key``. Each value is found or placed by bisection.
+    """
+    ordered = list(ordered)
+    for value in removed:
+        del ordered[bisect.bisect_left(ordered, _key(old_key, value), key=old_key)]
+    for value in added:
+        bisect.insort(ordered, value, key=new_key)
+    return tuple(ordered)
+
+
+def _key(key, value):
+    return value if key is None else key(value)
+
+
+class MenuIndex:
+    """
+    In-process search index over the rendered menu.
+
+    Names are indexed by trigram, plus the first one and two characters of
+    each word for shorter queries. Each posting list is kept in name order, so
+    a query walks its shortest posting list, checks each name for the full
+    query, and stops once it has ``limit`` matches: no scan over every name
+    and no sort. Prices are kept sorted for range filters.
+
+    ``sync`` is called with each new menu version. It diffs the payload
+    against the indexed one and only re-indexes items that were added,
+    changed or removed, rebuilding just the posting lists they touch, then
+    swaps in the new snapshot. Searches run against whichever snapshot was
+    current when they started, without locking.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._snapshot = _Snapshot(None, {}, {}, {}, {}, (), ())
+
+    def sync(self, version, data):
+        snapshot = self._snapshot
+        if snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot.version != version:
+                snapshot = self._snapshot = self._apply(snapshot, version, data)
+        return snapshot
+
+    def _apply(self, old, version, data):
+        records = {record["id"]: record for record in data}
+        removed = {pk for pk in old.records if pk not in records}
+        previous = old.records.get
+        changed = {pk for pk, record in records.items() if previous(pk) != record}
+        if len(removed) + len(changed) > max(64, len(records) // 16):
+            return self._build(version, records)
+        stale = {pk for pk in removed | changed if pk in old.folded}
+
+        folded, prices = dict(old.folded), dict(old.prices)
+        removals, additions = {}, {}
+        for pk in stale:
+            for key in _keys(folded.pop(pk)):
+                removals.setdefault(key, set()).add(pk)
+            del prices[pk]
+        for pk in changed:
+            folded[pk] = _fold(records[pk]["name"])
+            prices[pk] = Decimal(records[pk]["price"])
+            for key in _keys(folded[pk]):
+                additions.setdefault(key, set()).add(pk)
+
+        snapshot = _Snapshot(version, records, folded, prices, {}, (), ())
+        postings = dict(old.postings)
+        for key in removals.keys() | additions.keys():
+            ids = _resorted(
+                postings.get(key, ()),
+                removals.get(key, ()),
+                additions.get(key, ()),
+                old.name_key,
+                snapshot.name_key,
+            )
+            if ids:
+                postings[key] = ids
+            else:
+                del postings[key]
+        snapshot.postings = postings
+        snapshot.by_name = _resorted(
+            old.by_name, stale, changed, old.name_key, snapshot.name_key
+        )
+        snapshot.by_price = _resorted(
+            old.by_price,
+            [(old.prices[pk], pk) for pk in stale],
+            [(prices[pk], pk) for pk in changed],
+        )
+        return snapshot
+
+    def _build(self, version, records):
+        # For the first sync or a bulk change: walking the items in name
+        # order fills every posting list already sorted.
+        folded = {pk: _fold(record["name"]) for pk, record in records.items()}
+        prices = {pk: Decimal(record["price"]) for pk, record in records.items()}
+        snapshot = _Snapshot(version, records, folded, prices, {}, (), ())
+        snapshot.by_name = tuple(sorted(records, key=snapshot.name_key))
+        postings = {}
+        for pk in snapshot.by_name:
+            for key in _keys(folded[pk]):
+                postings.setdefault(key, []).append(pk)
+        snapshot.postings = {key: tuple(ids) for key, ids in postings.items()}
+        snapshot.by_price = tuple(sorted((price, pk) for pk, price in prices.items()))
+        return snapshot
+
+    async def asearch(self, version, data, **search):
+        """
+        ``search`` for async views. A new menu version is indexed in a
+        thread, so a rebuild does not stall the event loop.
+        """
+        if self._snapshot.version != version:
+            await sync_to_async(self.sync, thread_sensitive=False)(version, data)
+        return self.search(version, data, **search)
+
+    def search(
+        self,
+        version,
+        data,
+        q="",
+        min_price=None,
+        max_price=None,
+        sort=None,
+        limit=None,
+    ):
+        """
+        Return the rendered items whose name contains ``q`` (case-insensitive;
+        one- and two-character queries match word starts) and whose price is
+        within ``[min_price, max_price]``, in ``sort`` order.
+
+        Without ``sort``, matches for ``q`` come in name order and a plain
+        price filter in price order; the unfiltered menu keeps its order.
+        """
+        snapshot = self.sync(version, data)
+        q = _fold(q.strip())
+        low = Decimal("-Infinity") if min_price is None else min_price
+        high = Decimal("Infinity") if max_price is None else max_price
+        priced = min_price is not None or max_price is not None
+
+        if q:
+            keys = _trigrams(q) if len(q) >= 3 else {q}
+            candidates = min((snapshot.postings.get(key, ()) for key in keys), key=len)
+            # A posting list is exact when the query is its own key.
+            exact = len(keys) == 1 and len(q) <= 3
+            folded, prices = snapshot.folded, snapshot.prices
+            matches = (
+                pk
+                for pk in candidates
+                if (exact or q in folded[pk]) and low <= prices[pk] <= high
+            )
+            natural = "name"
+        elif priced or (sort and sort.lstrip("-") == "price"):
+            start = bisect.bisect_left(snapshot.by_price, (low,))
+            end = bisect.bisect_right(snapshot.by_price, (high, float("inf")))
+            matches = (pk for _, pk in snapshot.by_price[start:end])
+            natural = "price"
+        elif sort is None:
+            return data if limit is None else data[:limit]
+        else:
+            matches = iter(snapshot.by_name)
+            natural = "name"
+
+        if sort is None or sort == natural:
+            ids = list(itertools.islice(matches, limit))
+        elif sort == "-" + natural:
+            ids = list(matches)[::-1][:limit]
+        else:
+            if sort.lstrip("-") == "name":
+                key = snapshot.name_key
+            else:
+                key = lambda pk: (snapshot.prices[pk], pk)
+            ids = sorted(matches, key=key, reverse=sort.startswith("-"))[:limit]
+        return [snapshot.records[pk] for pk in ids]
+
+
+def parse_search(params):
+    """
+    Read ``q``, ``min_price``, ``max_price``, ``sort`` and ``limit`` from the
+    query string; raise ``ValueError`` on a bad value.
+    """
+    search = {"q": params.get("q", "")}
+    for name in ("min_price", "max_price"):
+        value = params.get(name)
+        if value not in (None, ""):
+            try:
+                search[name] = Decimal(value)
+            except InvalidOperation:
+                raise ValueError(f"{name} must be a number")
+            if not search[name].is_finite():
+                raise ValueError(f"{name} must be a number")
+    sort = params.get("sort") or None
+    if sort is not None and sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    search["sort"] = sort
+    limit = params.get("limit")
+    if limit not in (None, ""):
+        try:
+            search["limit"] = int(limit)
+        except ValueError:
+            search["limit"] = 0
+        if search["limit"] < 1:
+            raise ValueError("limit must be a positive integer")
+    return search
+
+
+def is_search(params):
+    return any(
+        params.get(name) for name in ("q", "min_price", "max_price", "sort", "limit")
+    )
+
+
+menu_index = MenuIndex()
@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from .models import User, MenuItem, Order
 from django.contrib.auth.hashers import make_password
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer as BaseTokenBlacklistSerializer,
+    TokenRefreshSerializer as BaseTokenRefreshSerializer,
+)
+from .tokens import RefreshToken
 
 # from django.contrib.auth import get_user_model
 
@@ -27,4 +32,56 @@ class MenuItemSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
-        fields = "__all__"
+        # Clients sync with opaque tokens; see orders.sync.
+        exclude = ["updated_at"]
+
+
+def _integer_digits(field):
+    return field.max_digits - field.decimal_places
+
+
+# The largest quantity whose total still fits ``Order.total_amount`` at any
+# menu price; anything above it would overflow the column on insert.
+MAX_QUANTITY = (
+    10
+    ** (
+        _integer_digits(Order._meta.get_field("total_amount"))
+        - _integer_digits(MenuItem._meta.get_field("price"))
+    )
+    - 1
+)
+MAX_CART_ITEMS = 100
+# The range of an AutoField; larger ids cannot exist and overflow the lookup.
+MAX_ID = 2**31 - 1
+
+
+class CartLineSerializer(serializers.Serializer):
+    menu_item = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_QUANTITY, default=1)
+
+
+class CartSerializer(serializers.Serializer):
+    items = CartLineSerializer(many=True, allow_empty=False, max_length=MAX_CART_ITEMS)
+
+
+class CancelOrdersSerializer(serializers.Serializer):
+    orders = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID),
+        allow_empty=False,
+        max_length=1000,
+        required=False,
+    )
+    menu_item = serializers.IntegerField(min_value=1, max_value=MAX_ID, required=False)
+
+    def validate(self, attrs):
+        if ("orders" in attrs) == ("menu_item" in attrs):
+            raise serializers.ValidationError("Pass either orders or menu_item.")
+        return attrs
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class TokenBlacklistSerializer(BaseTokenBlacklistSerializer):
+    token_class = RefreshToken
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .blacklist import blacklist_index
+from .cache import bump_menu_version
+from .models import MenuItem, Order
+from .sync import record_tombstones
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_menu_cache(sender, **kwargs):
+    # Bump only once the write is visible, otherwise a concurrent reader could
+    # cache the old rows under the new version.
+    transaction.on_commit(bump_menu_version)
+
+
+@receiver(pre_delete, sender=MenuItem)
+def tombstone_item_orders(sender, instance, **kwargs):
+    # Its orders go with it by cascade; synced clients need to drop them too.
+    record_tombstones(Order.objects.filter(menu_item=instance).only("id", "user_id"))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def announce_blacklisted_token(sender, instance, **kwargs):
+    # Any blacklisting, not only logout: the Django admin and other code too.
+    # Announced on commit so other processes reloading then see the row.
+    transaction.on_commit(blacklist_index.announce)
@@ -0,0 +1,100 @@
+import math
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket keyed by ``get_cache_key``, kept in two cache entries.
+
+    A rate of ``"30/min"`` is a bucket of 30 tokens refilled at 30 per minute,
+    so clients may burst up to the full rate and then continue at the refill
+    rate. ``<key>:start`` holds when the bucket was opened and ``<key>:count``
+    how many tokens have been taken since, bumped with the cache's atomic
+    ``incr``; the tokens available are ``capacity + elapsed * refill - count``.
+    Both entries expire when the bucket would be full again, which resets it.
+    Rates come from ``DEFAULT_THROTTLE_RATES`` under ``scope``; a rate of
+    ``None`` disables the throttle.
+    """
+
+    def get_rate(self):
+        # Looked up per instance, not frozen on the class at import time, so
+        # overridden settings take effect.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity = self.num_requests
+        refill = self.num_requests / self.duration
+        start_key, count_key = f"{self.key}:start", f"{self.key}:count"
+        now = self.timer()
+        window = self.duration
+
+        try:
+            count = self.cache.incr(count_key)
+            start = self.cache.get(start_key, now)
+        except ValueError:
+            # No bucket yet, or it lapsed: this request opens a new one.
+            if self.cache.add(count_key, 1, window):
+                self.cache.set(start_key, now, window)
+                start, count = now, 1
+            else:
+                count = self.cache.incr(count_key)
+                start = self.cache.get(start_key, now)
+
+        available = capacity + (now - start) * refill - count
+        if available < 0:
+            # Rejected requests do not spend a token.
+            self.cache.decr(count_key)
+            self.retry_after = -available / refill
+            return False
+
+        # Let the bucket lapse once it has refilled, so idle time never builds
+        # up more than ``capacity`` tokens.
+        ttl = max(1, math.ceil((capacity - available) / refill))
+        self.cache.touch(start_key, ttl)
+        self.cache.touch(count_key, ttl)
+        return True
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per authenticated user, falling back to the client IP."""
+
+    def get_cache_key(self, request, view):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            ident = f"user:{user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per client IP, for endpoints used before logging in."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": f"ip:{self.get_ident(request)}",
+        }
+
+
+class OrderThrottle(UserTokenBucketThrottle):
+    scope = "order"
+
+
+class SignupThrottle(IPTokenBucketThrottle):
+    scope = "signup"
+
+
+class LoginThrottle(IPTokenBucketThrottle):
+    scope = "login"
@@ -0,0 +1,20 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+# A module import: orders.blacklist imports this module back via orders.cache.
+from . import blacklist as token_blacklist
+
+
+class RefreshToken(BaseRefreshToken):
+    """Refresh token whose blacklist checks go through the in-memory index."""
+
+    def check_blacklist(self):
+        if token_blacklist.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        token_blacklist.blacklist_index.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
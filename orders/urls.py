@@ -6,7 +6,9 @@ from .views import (
     login,
     logout,
     order_menu_item,
+    checkout_cart,
     cancel_order,
+    cancel_orders_bulk,
     get_user_orders,
     browse_menu,
 )
@@ -18,6 +20,8 @@ urlpatterns = [
     path("logout/", logout, name="logout"),
     path("item/<int:pk>/order/", order_menu_item, name="order_menu_item"),
     path("item<int:pk>/cancel/", cancel_order, name="cancel_order"),
+    path("cart/checkout/", checkout_cart, name="checkout_cart"),
+    path("cancel/", cancel_orders_bulk, name="cancel_orders"),
     path("menu/", browse_menu, name="browse_menu"),
     path("user_orders/", get_user_orders, name="get_user_orders"),
 ]
@@ -1,16 +1,36 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
 from django.contrib.auth import authenticate
 from rest_framework import status
 from django.http import JsonResponse
-from .decorators import require_auth
+from .decorators import idempotent, require_auth, use_replica
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.utils import timezone
+from django.db import transaction
 from .models import User, MenuItem, Order
+from .tokens import RefreshToken
 from django.shortcuts import get_object_or_404
-from .serializers import UserSerializer, OrderSerializer
-from orders.serializers import MenuItemSerializer
+from .serializers import (
+    UserSerializer,
+    CartSerializer,
+    CancelOrdersSerializer,
+    MAX_QUANTITY,
+)
+from .cancellation import cancel_orders
+from .cache import etag_matches, get_menu_payload, get_menu_version, menu_etag
+from .outbox import ORDER_PLACED, publish
+from .pagination import paginated_response
+from .projections import order_projection
+from .rollups import record_orders
+from .search import is_search, menu_index, parse_search
+from .sync import (
+    ExpiredSyncToken,
+    InvalidSyncToken,
+    order_changes,
+    parse_sync_token,
+    replica_token,
+    sync_token,
+)
+from .throttling import LoginThrottle, OrderThrottle, SignupThrottle
 
 
 def home_view(request):
@@ -18,6 +38,7 @@ def home_view(request):
 
 
 @api_view(["POST"])
+@throttle_classes([SignupThrottle])
 def signup(request):
     try:
         serializer = UserSerializer(data=request.data)
@@ -41,7 +62,22 @@ def signup(request):
         )
 
 
+def login_payload(user):
+    refresh = RefreshToken.for_user(user)
+    refresh["is_admin"] = user.is_admin
+    refresh["username"] = user.username
+
+    return {
+        "status": "success",
+        "username": user.username,
+        "message": "Login successful",
+        "access": str(refresh.access_token),
+        "refresh": str(refresh),
+    }
+
+
 @api_view(["POST"])
+@throttle_classes([LoginThrottle])
 def login(request):
     try:
         username = request.data.get("username")
@@ -55,20 +91,7 @@ def login(request):
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
-        refresh = RefreshToken.for_user(user)
-        refresh["is_admin"] = user.is_admin
-        refresh["username"] = user.username
-
-        response = Response(
-            {
-                "status": "success",
-                "username": user.username,
-                "message": "Login successful",
-                "access": str(refresh.access_token),
-                "refresh": str(refresh),
-            },
-            status=status.HTTP_200_OK,
-        )
+        response = Response(login_payload(user), status=status.HTTP_200_OK)
 
         return response
 
@@ -100,52 +123,69 @@ def logout(request):
 @api_view(["GET"])
 @require_auth
 def browse_menu(request):
-    items = MenuItem.objects.all()
-    serializer = MenuItemSerializer(items, many=True)
-    return Response(
-        {"status": "success", "data": serializer.data}, status=status.HTTP_200_OK
-    )
+    version = get_menu_version()
+    etag = menu_etag(version)
+
+    if etag_matches(request.headers.get("If-None-Match", ""), etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        version, data = get_menu_payload(version)
+        if is_search(request.query_params):
+            try:
+                search = parse_search(request.query_params)
+            except ValueError as e:
+                return Response(
+                    {"status": "error", "message": str(e)},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            data = menu_index.search(version, data, **search)
+        response = Response(
+            {"status": "success", "data": data}, status=status.HTTP_200_OK
+        )
+
+    response["ETag"] = etag
+    return response
 
 
 @api_view(["POST"])
+@throttle_classes([OrderThrottle])
 @require_auth
+@idempotent
+@use_replica
 def order_menu_item(request, pk):
     try:
-        menu_item = MenuItem.objects.get(pk=pk)
-        quantity = int(request.data.get("quantity", 1))
-
-        if quantity <= 0:
+        try:
+            quantity = int(request.data.get("quantity", 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if not 0 < quantity <= MAX_QUANTITY:
             return Response(
                 {"status": "error", "message": "Invalid number"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        total_amount = menu_item.price * quantity
-        order_data = {
-            "user": request.user.id,
-            "menu_item": menu_item.id,
-            "quantity": quantity,
-            "ordered_at": timezone.now(),
-            "total_amount": total_amount,
-        }
-
-        serializer = OrderSerializer(data=order_data)
+        # The item is the only lookup; the user id comes from the token, so the
+        # row is written with one INSERT and no FK re-validation queries.
+        menu_item = MenuItem.objects.only("price").get(pk=pk)
+        order = Order(
+            user_id=request.user_id,
+            menu_item=menu_item,
+            quantity=quantity,
+            total_amount=menu_item.price * quantity,
+        )
+        with transaction.atomic():
+            order.save(force_insert=True)
+            record_orders([order])
+            publish(ORDER_PLACED, [order])
 
-        if serializer.is_valid():
-            order = serializer.save()
-            return Response(
-                {
-                    "status": "success",
-                    "message": "Order successful",
-                    "data": serializer.data,
-                },
-                status=status.HTTP_201_CREATED,
-            )
-        else:
-            return Response(
-                {"status": "error", "message": serializer.errors},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        return Response(
+            {
+                "status": "success",
+                "message": "Order successful",
+                "data": order_projection.render_objects([order])[0],
+            },
+            status=status.HTTP_201_CREATED,
+        )
 
     except MenuItem.DoesNotExist:
         return Response(
@@ -159,26 +199,78 @@ def order_menu_item(request, pk):
         )
 
 
+@api_view(["POST"])
+@throttle_classes([OrderThrottle])
+@require_auth
+@idempotent
+@use_replica
+def checkout_cart(request):
+    cart = CartSerializer(data=request.data)
+    if not cart.is_valid():
+        return Response(
+            {"status": "error", "message": cart.errors},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    lines = cart.validated_data["items"]
+    menu_items = MenuItem.objects.in_bulk({line["menu_item"] for line in lines})
+    missing = sorted({line["menu_item"] for line in lines} - menu_items.keys())
+    if missing:
+        return Response(
+            {"status": "error", "message": "Item does not exist!", "items": missing},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    orders = [
+        Order(
+            user_id=request.user_id,
+            menu_item=menu_items[line["menu_item"]],
+            quantity=line["quantity"],
+            total_amount=menu_items[line["menu_item"]].price * line["quantity"],
+        )
+        for line in lines
+    ]
+    with transaction.atomic():
+        Order.objects.bulk_create(orders)
+        record_orders(orders)
+        publish(ORDER_PLACED, orders)
+
+    return Response(
+        {
+            "status": "success",
+            "message": "Order successful",
+            "data": order_projection.render_objects(orders),
+        },
+        status=status.HTTP_201_CREATED,
+    )
+
+
 @api_view(["DELETE"])
 @require_auth
+@use_replica
 def cancel_order(request, pk):
     try:
-        order = Order.objects.filter(menu_item_id=pk, user_id=request.user_id).first()
+        # The user's most recent order for the item, in one DELETE.
+        with transaction.atomic():
+            cancelled = cancel_orders(
+                Order.objects.filter(menu_item_id=pk, user_id=request.user_id).order_by(
+                    "-ordered_at", "-id"
+                ),
+                limit=1,
+            )
 
-        if not order:
+        if not cancelled:
             return Response(
                 {"status": "error", "message": "No such order!"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        order.delete()
-
         return Response(
             {
                 "status": "success",
                 "message": "Order cancelled successfully",
                 "data": {
-                    "refund_amount": order.total_amount,
+                    "refund_amount": f"{cancelled[0].total_amount:.2f}",
                 },
             },
             status=status.HTTP_200_OK,
@@ -189,11 +281,89 @@ def cancel_order(request, pk):
         )
 
 
+@api_view(["POST"])
+@require_auth
+@use_replica
+def cancel_orders_bulk(request):
+    serializer = CancelOrdersSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {"status": "error", "message": serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    orders = Order.objects.filter(user_id=request.user_id)
+    order_ids = serializer.validated_data.get("orders")
+    if order_ids is not None:
+        orders = orders.filter(pk__in=order_ids)
+    else:
+        orders = orders.filter(menu_item_id=serializer.validated_data["menu_item"])
+
+    with transaction.atomic():
+        cancelled = cancel_orders(orders)
+        missing = sorted(set(order_ids or ()) - {order.id for order in cancelled})
+        if missing or not cancelled:
+            # All or nothing, like the cart checkout.
+            transaction.set_rollback(True)
+
+    if missing or not cancelled:
+        return Response(
+            {"status": "error", "message": "No such order!", "orders": missing},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    return Response(
+        {
+            "status": "success",
+            "message": "Orders cancelled successfully",
+            "data": {
+                "cancelled": sorted(order.id for order in cancelled),
+                "refund_amount": f"{sum(order.total_amount for order in cancelled):.2f}",
+            },
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
 @api_view(["GET"])
 @require_auth
+@use_replica
 def get_user_orders(request):
-    order = Order.objects.filter(user_id=request.user_id)
-    serializer = OrderSerializer(order, many=True)
+    token = sync_token()
+    since = request.query_params.get("since")
+    if since:
+        try:
+            changes = order_changes(
+                request.user_id, parse_sync_token(since), order_projection
+            )
+        except (InvalidSyncToken, ExpiredSyncToken) as e:
+            return sync_error(e)
+        return Response(
+            {"status": "success", **changes, "sync_token": token},
+            status=status.HTTP_200_OK,
+        )
+
+    orders = Order.objects.filter(user_id=request.user_id)
+    token = replica_token(orders) or token
+    return paginated_response(
+        request,
+        orders,
+        ("-ordered_at", "-id"),
+        order_projection,
+        extra={"sync_token": token},
+    )
+
+
+def sync_error(error):
+    if isinstance(error, ExpiredSyncToken):
+        return Response(
+            {
+                "status": "error",
+                "message": "Sync token expired, fetch the full order history",
+            },
+            status=status.HTTP_410_GONE,
+        )
     return Response(
-        {"status": "success", "data": serializer.data}, status=status.HTTP_200_OK
+        {"status": "error", "message": "Invalid sync token"},
+        status=status.HTTP_400_BAD_REQUEST,
     )
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+
+import pytest
+from django.core.cache import cache
+
+from food_ordering_api.instrumentation import record_queries
+from orders import cache as menu_cache
+from orders.blacklist import blacklist_index
+from orders.search import menu_index
+
+
+@pytest.fixture(autouse=True)
+def primary_only(settings):
+    # Tests opt in to replica routing; see test_replica_routing.
+    settings.REPLICA_DATABASE = None
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    menu_cache._local.update(version=None, data=None)
+    blacklist_index.reset()
+    menu_index.reset()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    ``with query_budget(n):`` fails if the block runs more than ``n`` queries.
+
+    Savepoint statements from ``atomic()`` are not counted.
+    """
+
+    @contextmanager
+    def budget(limit):
+        with record_queries() as queries:
+            yield queries
+        executed = "\n".join(query["sql"] for query in queries)
+        assert (
+            len(queries) <= limit
+        ), f"{len(queries)} queries executed, budget is {limit}:\n{executed}"
+
+    return budget
@@ -1,6 +1,27 @@
+import asyncio
+import base64
+import json
+from io import StringIO
+from datetime import timedelta
 import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import AsyncClient, AsyncRequestFactory
+from django.utils import timezone
 from rest_framework.test import APIClient
-from orders.models import User, MenuItem
+from admin_api.async_views import order_stream
+from admin_api.feed import event_stream, get_feed
+from orders.models import (
+    User,
+    MenuItem,
+    Order,
+    ArchivedOrder,
+    OrderTombstone,
+    OutboxEvent,
+    SalesRollupStaging,
+)
 
 
 @pytest.mark.django_db
@@ -85,3 +106,570 @@ def test_admin_get_orders():
     client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
     response = client.get("/admin_api/orders/")
     assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_admin_get_orders_paginated():
+    admin = User.objects.create_user(
+        username="admin5", password="adminpass5", is_admin=True
+    )
+    item = MenuItem.objects.create(name="Tea", price=20)
+    orders = [
+        Order.objects.create(user=admin, menu_item=item, quantity=1, total_amount=20)
+        for _ in range(5)
+    ]
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "admin5", "password": "adminpass5"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    pages = []
+    response = client.get("/admin_api/orders/", {"page_size": 2})
+    while True:
+        assert response.status_code == 200
+        pages.append([order["id"] for order in response.data["data"]])
+        if response.data["next"] is None:
+            break
+        response = client.get(
+            "/admin_api/orders/", {"page_size": 2, "cursor": response.data["next"]}
+        )
+
+    expected = sorted((order.id for order in orders), reverse=True)
+    assert pages == [expected[0:2], expected[2:4], expected[4:5]]
+
+    previous = client.get(
+        "/admin_api/orders/", {"page_size": 2, "cursor": response.data["previous"]}
+    )
+    assert [order["id"] for order in previous.data["data"]] == expected[2:4]
+
+    invalid = client.get("/admin_api/orders/", {"cursor": "not-a-cursor"})
+    assert invalid.status_code == 400
+    # Decodes, but the values are not an ordered_at and an id.
+    for url, values in (
+        ("/admin_api/orders/", b'["x","y"]'),
+        ("/admin_api/orders/", b"[{},[]]"),
+        ("/admin_api/users/", b'["x"]'),
+    ):
+        tampered = base64.urlsafe_b64encode(b'{"k":%s,"r":false}' % values).decode()
+        assert client.get(url, {"cursor": tampered}).status_code == 400
+        response = async_to_sync(AsyncClient().get)(
+            url,
+            {"cursor": tampered},
+            headers={"Authorization": f"Bearer {login.data['access']}"},
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_admin_export_orders(settings):
+    settings.EXPORT_CHUNK_SIZE = 2
+    admin = User.objects.create_user(
+        username="admin6", password="adminpass6", is_admin=True
+    )
+    item = MenuItem.objects.create(name="Coffee", price=30)
+    for quantity in range(1, 6):
+        Order.objects.create(
+            user=admin, menu_item=item, quantity=quantity, total_amount=30 * quantity
+        )
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "admin6", "password": "adminpass6"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    response = client.get("/admin_api/orders/export/")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record["quantity"] for record in records] == [1, 2, 3, 4, 5]
+    assert records[0]["menu_item"] == item.id
+
+    response = client.get(
+        "/admin_api/orders/export/", {"output": "csv", "from": "2000-01-01"}
+    )
+    rows = b"".join(response.streaming_content).decode().splitlines()
+    assert rows[0] == "id,quantity,ordered_at,total_amount,user,menu_item"
+    assert len(rows) == 6
+
+    response = client.get("/admin_api/orders/export/", {"to": "2000-01-01"})
+    assert b"".join(response.streaming_content) == b""
+
+    response = client.get("/admin_api/orders/export/", {"from": "yesterday"})
+    assert response.status_code == 400
+
+    # Under ASGI the export streams from an async iterator, chunk by chunk,
+    # instead of being collected into a list before the first byte.
+    async def export(params):
+        response = await AsyncClient().get(
+            "/admin_api/orders/export/",
+            params,
+            headers={"Authorization": f"Bearer {login.data['access']}"},
+        )
+        assert response.is_async
+        return [chunk async for chunk in response.streaming_content]
+
+    chunks = async_to_sync(export)({})
+    records = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [record["quantity"] for record in records] == [1, 2, 3, 4, 5]
+    assert len(chunks) == 3
+    chunks = async_to_sync(export)({"output": "csv"})
+    assert b"".join(chunks).decode().splitlines() == rows
+
+
+@pytest.mark.django_db
+def test_admin_async_read_endpoints():
+    admin = User.objects.create_user(
+        username="admin7", password="adminpass7", is_admin=True
+    )
+    user = User.objects.create_user(username="user7", password="userpass7")
+    item = MenuItem.objects.create(name="Dosa", price=90)
+    Order.objects.create(user=user, menu_item=item, quantity=1, total_amount=90)
+    login = APIClient().post(
+        "/orders/login/",
+        {"username": "admin7", "password": "adminpass7"},
+        format="json",
+    )
+    client = AsyncClient()
+    auth = {"Authorization": f"Bearer {login.data['access']}"}
+
+    users = async_to_sync(client.get)("/admin_api/users/", headers=auth)
+    assert users.status_code == 200
+    assert [u["username"] for u in users.json()["data"]] == ["admin7", "user7"]
+
+    orders = async_to_sync(client.get)("/admin_api/orders/", headers=auth)
+    assert orders.status_code == 200
+    assert orders.json()["data"][0]["menu_item"] == item.id
+
+    detail = async_to_sync(client.get)(f"/admin_api/items/{item.id}/", headers=auth)
+    assert detail.json()["data"] == {"id": item.id, "name": "Dosa", "price": "90.00"}
+    assert (
+        async_to_sync(client.get)("/admin_api/items/999/", headers=auth).status_code
+        == 404
+    )
+
+    updated = async_to_sync(client.put)(
+        f"/admin_api/items/{item.id}/",
+        {"name": "Masala Dosa", "price": 110},
+        content_type="application/json",
+        headers=auth,
+    )
+    assert updated.status_code == 200
+    assert MenuItem.objects.get(pk=item.id).name == "Masala Dosa"
+
+    forbidden = APIClient().post(
+        "/orders/login/",
+        {"username": "user7", "password": "userpass7"},
+        format="json",
+    )
+    client = AsyncClient()
+    auth = {"Authorization": f"Bearer {forbidden.data['access']}"}
+    assert (
+        async_to_sync(client.get)("/admin_api/orders/", headers=auth).status_code == 403
+    )
+
+
+@pytest.mark.django_db
+def test_admin_get_orders_filters():
+    admin = User.objects.create_user(
+        username="admin8", password="adminpass8", is_admin=True
+    )
+    user = User.objects.create_user(username="user8", password="userpass8")
+    tea = MenuItem.objects.create(name="Tea", price=20)
+    cake = MenuItem.objects.create(name="Cake", price=60)
+    Order.objects.create(user=user, menu_item=tea, quantity=1, total_amount=20)
+    Order.objects.create(user=user, menu_item=cake, quantity=1, total_amount=60)
+    Order.objects.create(user=admin, menu_item=cake, quantity=2, total_amount=120)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "admin8", "password": "adminpass8"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    response = client.get("/admin_api/orders/", {"user": user.id})
+    assert len(response.data["data"]) == 2
+    response = client.get("/admin_api/orders/", {"user": user.id, "menu_item": cake.id})
+    assert [order["total_amount"] for order in response.data["data"]] == ["60.00"]
+    response = client.get("/admin_api/orders/", {"to": "2000-01-01"})
+    assert response.data["data"] == []
+    response = client.get("/admin_api/orders/", {"menu_item": "cake"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_archive_orders(settings):
+    admin = User.objects.create_user(
+        username="admin9", password="adminpass9", is_admin=True
+    )
+    users = [User.objects.create_user(username=f"archive{i}") for i in range(20)]
+    items = [MenuItem.objects.create(name=f"Old {i}", price=10) for i in range(10)]
+    Order.objects.bulk_create(
+        (
+            Order(user=users[i % 20], menu_item=items[i % 10], quantity=1)
+            for i in range(20000)
+        ),
+        batch_size=5000,
+    )
+    ids = list(Order.objects.order_by("id").values_list("id", flat=True))
+    old = timezone.now() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS + 30)
+    Order.objects.filter(id__lte=ids[18999]).update(ordered_at=old, total_amount=10)
+
+    user = users[3]
+    history = Order.objects.filter(user=user).order_by("-ordered_at", "-id")
+    assert "order_user_ordered_at_idx" in history.explain()
+
+    def rows_scanned():
+        # What the hot queries read: a revenue total scans the whole table,
+        # a user's history its range of the (user, ordered_at) index.
+        return Order.objects.count(), history.count()
+
+    assert rows_scanned() == (20000, 1000)
+    dry_run = StringIO()
+    call_command("archive_orders", dry_run=True, stdout=dry_run)
+    assert dry_run.getvalue().startswith("19000 orders")
+    assert Order.objects.count() == 20000
+
+    out = StringIO()
+    call_command("archive_orders", batch_size=5000, sleep=0, stdout=out)
+    assert "Archived 19000 orders" in out.getvalue()
+    assert rows_scanned() == (1000, 50)
+
+    assert Order.objects.count() == 1000
+    assert min(Order.objects.values_list("id", flat=True)) == ids[19000]
+    archived = ArchivedOrder.objects.order_by("id")
+    assert list(archived.values_list("id", flat=True)) == ids[:19000]
+    assert archived.aggregate(revenue=Sum("total_amount"))["revenue"] == 190000
+    assert archived.filter(archived_at__isnull=True).count() == 0
+    assert not OrderTombstone.objects.exists()
+
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "admin9", "password": "adminpass9"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    expected = list(
+        Order.objects.filter(user=user)
+        .order_by("-ordered_at", "-id")
+        .values_list("id", flat=True)
+    ) + sorted(archived.filter(user=user).values_list("id", flat=True), reverse=True)
+    hot = client.get("/admin_api/orders/", {"user": user.id, "page_size": 1000})
+    assert [order["id"] for order in hot.data["data"]] == expected[:50]
+
+    pages = []
+    params = {"user": user.id, "include_archived": "1", "page_size": 300}
+    response = client.get("/admin_api/orders/", params)
+    while True:
+        pages.append([order["id"] for order in response.data["data"]])
+        if response.data["next"] is None:
+            break
+        response = client.get(
+            "/admin_api/orders/", {**params, "cursor": response.data["next"]}
+        )
+    assert [pk for page in pages for pk in page] == expected
+    previous = client.get(
+        "/admin_api/orders/", {**params, "cursor": response.data["previous"]}
+    )
+    assert [order["id"] for order in previous.data["data"]] == pages[-2]
+
+    auth = {"Authorization": f"Bearer {login.data['access']}"}
+    response = async_to_sync(AsyncClient().get)(
+        "/admin_api/orders/", {**params, "page_size": 60}, headers=auth
+    )
+    assert [order["id"] for order in response.json()["data"]] == expected[:60]
+
+
+@pytest.mark.django_db
+def test_order_queries_use_indexes():
+    users = [User.objects.create_user(username=f"plan{i}") for i in range(20)]
+    items = [MenuItem.objects.create(name=f"Plan {i}", price=10) for i in range(20)]
+    Order.objects.bulk_create(
+        Order(user=users[i % 20], menu_item=items[i % 17], quantity=1)
+        for i in range(2000)
+    )
+    since = timezone.now() - timedelta(days=1)
+
+    by_user = Order.objects.filter(user_id=users[0].id, ordered_at__gte=since)
+    assert "order_user_ordered_at_idx" in by_user.order_by("-ordered_at").explain()
+
+    by_item = Order.objects.filter(menu_item_id=items[0].id, user_id=users[0].id)
+    assert "order_item_user_idx" in by_item.explain()
+
+    by_date = Order.objects.filter(ordered_at__gte=since).order_by("-ordered_at")
+    assert "order_ordered_at_idx" in by_date[:100].explain()
+
+    changed = Order.objects.filter(user_id=users[0].id, updated_at__gte=since)
+    assert "order_user_updated_at_idx" in changed.order_by("updated_at").explain()
+    deleted = OrderTombstone.objects.filter(user_id=users[0].id, deleted_at__gte=since)
+    assert "tombstone_user_deleted_idx" in deleted.explain()
+    archived = ArchivedOrder.objects.filter(user_id=users[0].id, ordered_at__gte=since)
+    assert "archived_user_ordered_at_idx" in archived.order_by("-ordered_at").explain()
+
+
+@pytest.mark.django_db
+def test_sales_rollups_and_report():
+    admin = User.objects.create_user(
+        username="admin9", password="adminpass9", is_admin=True
+    )
+    tea = MenuItem.objects.create(name="Tea", price=20)
+    cake = MenuItem.objects.create(name="Cake", price=60)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "admin9", "password": "adminpass9"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    client.post(f"/orders/item/{tea.id}/order/", {"quantity": 2}, format="json")
+    client.post(f"/orders/item/{tea.id}/order/", {"quantity": 1}, format="json")
+    client.post(
+        "/orders/cart/checkout/",
+        {"items": [{"menu_item": cake.id, "quantity": 1}]},
+        format="json",
+    )
+    client.delete(f"/orders/item{tea.id}/cancel/")
+
+    response = client.get("/admin_api/reports/sales/", {"granularity": "hour"})
+    assert response.status_code == 200
+    by_item = {row["menu_item"]: row for row in response.data["data"]}
+    remaining = Order.objects.get(menu_item=tea)
+    assert by_item[tea.id]["quantity"] == remaining.quantity
+    assert by_item[tea.id]["revenue"] == f"{remaining.total_amount:.2f}"
+    assert by_item[cake.id]["revenue"] == "60.00"
+    assert response.data["totals"]["quantity"] == remaining.quantity + 1
+
+    report = client.get("/admin_api/reports/sales/", {"by": "bucket"}).data
+    assert report["data"][0]["quantity"] == remaining.quantity + 1
+
+    call_command("rebuild_sales_rollups", batch_size=1, stdout=StringIO())
+    assert client.get("/admin_api/reports/sales/", {"by": "bucket"}).data == report
+
+    staged = []
+
+    class OrderWhileRebuilding(StringIO):
+        # Places an order after the first batch, past the rebuild's max id.
+        def write(self, text):
+            if not self.getvalue():
+                client.post(
+                    f"/orders/item/{cake.id}/order/", {"quantity": 1}, format="json"
+                )
+            # Each batch is already written to the staging table.
+            staged.append(SalesRollupStaging.objects.count())
+            return super().write(text)
+
+    call_command("rebuild_sales_rollups", batch_size=1, stdout=OrderWhileRebuilding())
+    totals = client.get("/admin_api/reports/sales/").data["totals"]
+    assert totals["quantity"] == remaining.quantity + 2
+    assert staged[0] > 0 and staged[-1] == 0
+
+    # Archived orders are moved, not cancelled: a rebuild still counts them.
+    call_command("archive_orders", days=-1, sleep=0, stdout=StringIO())
+    assert not Order.objects.exists()
+    call_command("rebuild_sales_rollups", stdout=StringIO())
+    assert client.get("/admin_api/reports/sales/").data["totals"] == totals
+
+
+@pytest.mark.django_db(transaction=True)
+def test_admin_import_menu(tmp_path, query_budget):
+    from orders.cache import get_menu_version
+
+    User.objects.create_user(username="importer", password="importpass", is_admin=True)
+    chai = MenuItem.objects.create(name="Chai", price=20)
+    dosa = MenuItem.objects.create(name="Dosa", price=90)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "importer", "password": "importpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    version = get_menu_version()
+
+    # Every bad row is reported and nothing is written.
+    response = client.post(
+        "/admin_api/items/import/",
+        [
+            {"name": "Idli", "price": "40"},
+            {"name": "", "price": "abc"},
+            {"id": 999, "name": "Ghost", "price": "1"},
+            {"name": "Idli", "price": "45"},
+        ],
+        format="json",
+    )
+    assert response.status_code == 400
+    assert [error["row"] for error in response.data["errors"]] == [2, 3, 4]
+    assert set(response.data["errors"][0]["errors"]) == {"name", "price"}
+    assert MenuItem.objects.count() == 2
+
+    for body in ("abc", 5):
+        response = client.post("/admin_api/items/import/", body, format="json")
+        assert response.status_code == 400
+        assert response.data["message"] == "expected a list of items"
+
+    # One read, one INSERT, one UPDATE, whatever the number of rows.
+    rows = [{"name": f"Item {n}", "price": "10.50"} for n in range(50)]
+    rows += [{"id": chai.id, "name": "Masala Chai", "price": "25"}]
+    rows += [{"name": "Dosa", "price": "90.00"}]
+    with query_budget(3):
+        response = client.post(
+            "/admin_api/items/import/", {"items": rows}, format="json"
+        )
+    assert response.status_code == 200
+    assert response.data["data"] == {"created": 50, "updated": 1, "unchanged": 1}
+    assert MenuItem.objects.get(pk=chai.id).name == "Masala Chai"
+    assert get_menu_version() == version + 1
+
+    path = tmp_path / "menu.csv"
+    path.write_text(f"id,name,price\n{dosa.id},Dosa,95\n,Vada,30\n")
+    out = StringIO()
+    call_command("import_menu", str(path), batch_size=1, stdout=out)
+    assert "1 created, 1 updated, 0 unchanged" in out.getvalue()
+    assert MenuItem.objects.get(pk=dosa.id).price == 95
+    assert get_menu_version() == version + 2
+
+    upload = SimpleUploadedFile("menu.json", b'[{"name": "Vada", "price": "30"}]')
+    response = client.post(
+        "/admin_api/items/import/", {"file": upload}, format="multipart"
+    )
+    assert response.data["data"] == {"created": 0, "updated": 0, "unchanged": 1}
+
+
+@pytest.mark.django_db
+def test_import_menu_without_conflict_target(monkeypatch):
+    from django.db import connection
+    from admin_api.menu_import import import_menu
+
+    chai = MenuItem.objects.create(name="Chai", price=20)
+    # Like MySQL: an upsert without a conflict target, ON DUPLICATE KEY style.
+    monkeypatch.setattr(
+        connection.features, "supports_update_conflicts_with_target", False
+    )
+    untargeted = []
+
+    def on_conflict_suffix_sql(fields, on_conflict, update_fields, unique_fields):
+        untargeted.append(list(unique_fields))
+        assignments = ", ".join(f"{f} = excluded.{f}" for f in update_fields)
+        return f"ON CONFLICT DO UPDATE SET {assignments}"
+
+    monkeypatch.setattr(
+        connection.ops, "on_conflict_suffix_sql", on_conflict_suffix_sql
+    )
+    result = import_menu([{"id": chai.id, "name": "Masala Chai", "price": "25"}])
+    assert result.updated == 1 and untargeted == [[]]
+    assert MenuItem.objects.get(pk=chai.id).name == "Masala Chai"
+
+    # No upsert at all: batched UPDATEs.
+    monkeypatch.setattr(connection.features, "supports_update_conflicts", False)
+    result = import_menu([{"id": chai.id, "name": "Chai", "price": "22"}])
+    assert result.updated == 1 and len(untargeted) == 1
+    assert MenuItem.objects.get(pk=chai.id).price == 22
+
+
+@pytest.mark.django_db
+def test_admin_order_stream(settings, monkeypatch):
+    settings.ORDER_FEED_POLL_INTERVAL = 0.01
+    User.objects.create_user(username="watcher", password="watchpass", is_admin=True)
+    User.objects.create_user(username="diner", password="dinerpass")
+    item = MenuItem.objects.create(name="Vada", price=30)
+
+    def login(username, password):
+        response = APIClient().post(
+            "/orders/login/", {"username": username, "password": password}
+        )
+        return {"Authorization": f"Bearer {response.data['access']}"}
+
+    admin, diner = login("watcher", "watchpass"), login("diner", "dinerpass")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=diner["Authorization"])
+    for _ in range(2):
+        client.post(f"/orders/item/{item.id}/order/", {"quantity": 1}, format="json")
+    first, second = OutboxEvent.objects.values_list("id", flat=True)
+
+    stream = "/admin_api/orders/stream/"
+    assert async_to_sync(AsyncClient().get)(stream, headers=diner).status_code == 403
+    response = async_to_sync(AsyncClient().get)(
+        stream, {"since": "latest"}, headers=admin
+    )
+    assert response.status_code == 400
+
+    async def watch():
+        request = AsyncRequestFactory().get(
+            stream, headers={**admin, "Last-Event-ID": str(first)}
+        )
+        response = await order_stream(request)
+        assert response["Content-Type"] == "text/event-stream"
+        chunks = event_stream(first)
+        try:
+            assert await anext(chunks) == "retry: 3000\n\n"
+            # Missed events are replayed from the table...
+            replayed = await anext(chunks)
+            assert replayed.startswith(f"id: {second}\nevent: order.placed\ndata: ")
+            # ...then new ones arrive from the live poller.
+            await sync_to_async(client.delete)(f"/orders/item{item.id}/cancel/")
+            live = await asyncio.wait_for(anext(chunks), 5)
+            assert live.startswith(f"id: {second + 1}\nevent: order.cancelled\n")
+            assert json.loads(live.split("data: ")[1])["menu_item"] == item.id
+            assert len(get_feed().subscribers) == 1
+        finally:
+            await chunks.aclose()
+        assert get_feed().subscribers == set()
+
+        # Orders placed while nobody watches are not pushed to the next
+        # subscriber, and polls page through a burst of events.
+        await sync_to_async(client.post)(
+            f"/orders/item/{item.id}/order/", {"quantity": 1}, format="json"
+        )
+        chunks = event_stream()
+        try:
+            await anext(chunks)
+            await sync_to_async(client.post)(
+                "/orders/cart/checkout/",
+                {"items": [{"menu_item": item.id, "quantity": n} for n in (1, 2)]},
+                format="json",
+            )
+            latest = (
+                await OutboxEvent.objects.order_by("-id")
+                .values_list("id", flat=True)
+                .afirst()
+            )
+            for pk in (latest - 1, latest):
+                live = await asyncio.wait_for(anext(chunks), 5)
+                assert live.startswith(f"id: {pk}\n")
+        finally:
+            await chunks.aclose()
+
+    monkeypatch.setattr("admin_api.feed.POLL_PAGE_SIZE", 1)
+    async_to_sync(watch)()
+
+
+@pytest.mark.django_db
+def test_order_stream_delivers_late_commits(settings):
+    settings.ORDER_FEED_POLL_INTERVAL = 0.01
+    for pk in (1, 2, 4):
+        OutboxEvent.objects.create(id=pk, topic="order.placed", payload={})
+
+    async def watch():
+        # Id 3 is still in flight when the stream starts, below both the
+        # feed's starting point and the last replayed id.
+        chunks = event_stream(1)
+        try:
+            await anext(chunks)
+            for pk in (2, 4):
+                assert (await anext(chunks)).startswith(f"id: {pk}\n")
+            await OutboxEvent.objects.acreate(id=3, topic="order.placed", payload={})
+            live = await asyncio.wait_for(anext(chunks), 5)
+            assert live.startswith("id: 3\n")
+            assert get_feed().gaps == {}
+        finally:
+            await chunks.aclose()
+
+    async_to_sync(watch)()
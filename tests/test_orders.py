@@ -1,7 +1,43 @@
+import asyncio
+import datetime
+import decimal
+import gzip
+import hashlib
+import io
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import brotli
 import pytest
-from rest_framework.test import APIClient
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings as django_settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
-from orders.models import Order, User, MenuItem
+from food_ordering_api.instrumentation import record_queries
+from food_ordering_api.middleware import CompressionMiddleware
+from orders.authentication import VerifiedTokenCache
+from orders.decorators import use_replica
+from orders.models import Order, User, MenuItem, OutboxEvent, SalesRollup
+from orders.outbox import ORDER_CANCELLED, ORDER_PLACED, MemorySink, drain
+from orders.rollups import record_orders
+from orders.renderers import FastJSONRenderer
+from orders.search import MenuIndex
+from orders.serializers import MAX_CART_ITEMS, MAX_QUANTITY, OrderSerializer
+from orders.sync import ExpiredSyncToken, parse_sync_token
+from orders.throttling import OrderThrottle
+from orders.tokens import RefreshToken
+from orders.projections import menu_item_projection, order_projection, user_projection
 
 
 @pytest.mark.django_db
@@ -112,7 +148,7 @@ def test_cancel_order():
     assert cancel_response.status_code == 200
     assert cancel_response.data["status"] == "success"
     assert cancel_response.data["message"] == "Order cancelled successfully"
-    assert cancel_response.data["data"]["refund_amount"] == item.price
+    assert cancel_response.data["data"]["refund_amount"] == "40.00"
 
 
 @pytest.mark.django_db
@@ -153,3 +189,1021 @@ def test_get_user_orders():
     menu_item_ids = [item["menu_item"] for item in response.data["data"]]
     assert item1.id in menu_item_ids
     assert item2.id in menu_item_ids
+
+
+@pytest.mark.django_db
+def test_browse_menu_not_modified(django_assert_num_queries):
+    MenuItem.objects.create(name="Pasta", price=120)
+    client = APIClient()
+    response = client.get("/orders/menu/")
+    assert response.status_code == 200
+    etag = response["ETag"]
+
+    with django_assert_num_queries(0):
+        cached = client.get("/orders/menu/", HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+    assert cached["ETag"] == etag
+
+
+@pytest.mark.django_db
+def test_browse_menu_invalidated_on_item_write(django_capture_on_commit_callbacks):
+    client = APIClient()
+    first = client.get("/orders/menu/")
+    assert first.data["data"] == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        MenuItem.objects.create(name="Pizza", price=150)
+
+    response = client.get("/orders/menu/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert response.status_code == 200
+    assert response["ETag"] != first["ETag"]
+    assert [item["name"] for item in response.data["data"]] == ["Pizza"]
+
+
+@pytest.mark.django_db
+def test_browse_menu_version_expires_with_local_cache(settings):
+    settings.MENU_VERSION_LOCAL_TIMEOUT = 1
+    client = APIClient()
+    first = client.get("/orders/menu/")
+    # Written by another process: this one's locmem cache never hears of it.
+    MenuItem.objects.bulk_create([MenuItem(name="Pizza", price=150)])
+    assert client.get("/orders/menu/").data["data"] == []
+
+    time.sleep(1.1)
+    response = client.get("/orders/menu/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert response.status_code == 200
+    assert [item["name"] for item in response.data["data"]] == ["Pizza"]
+
+
+@pytest.mark.django_db
+def test_browse_menu_search(django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username="searcher", password="searchpass")
+    for name, price in [
+        ("Paneer Tikka", 220),
+        ("Kadai Paneer", 250),
+        ("Masala Dosa", 90),
+        ("Pani Puri", 40),
+        ("Dal Makhani", 180),
+    ]:
+        MenuItem.objects.create(name=name, price=price)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "searcher", "password": "searchpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    def names(**params):
+        response = client.get("/orders/menu/", params)
+        assert response.status_code == 200
+        return [item["name"] for item in response.data["data"]]
+
+    assert names(q="PANEER") == ["Kadai Paneer", "Paneer Tikka"]
+    assert names(q="pa") == ["Kadai Paneer", "Paneer Tikka", "Pani Puri"]
+    assert names(q="neer t") == ["Paneer Tikka"]
+    assert names(q="pa", sort="-price", limit=2) == ["Kadai Paneer", "Paneer Tikka"]
+    assert names(min_price=90, max_price="220.00") == [
+        "Masala Dosa",
+        "Dal Makhani",
+        "Paneer Tikka",
+    ]
+    assert names(sort="name")[0] == "Dal Makhani"
+    assert names(q="xyz") == []
+    assert client.get("/orders/menu/", {"sort": "rating"}).status_code == 400
+    assert client.get("/orders/menu/", {"min_price": "cheap"}).status_code == 400
+
+    # Admin writes bump the menu version; the index picks up just that change.
+    with django_capture_on_commit_callbacks(execute=True):
+        MenuItem.objects.filter(name="Pani Puri").get().delete()
+        MenuItem.objects.create(name="Paneer Butter Masala", price=260)
+    assert names(q="pa", sort="price") == [
+        "Paneer Tikka",
+        "Kadai Paneer",
+        "Paneer Butter Masala",
+    ]
+    assert names(q="masala") == ["Masala Dosa", "Paneer Butter Masala"]
+
+    response = async_to_sync(AsyncClient().get)(
+        "/orders/menu/",
+        {"q": "dosa"},
+        headers={"Authorization": f"Bearer {login.data['access']}"},
+    )
+    assert [item["name"] for item in response.json()["data"]] == ["Masala Dosa"]
+
+
+def test_menu_index_incremental_sync_matches_rebuild():
+    rng = random.Random(0)
+    words = ["paneer", "tikka", "masala", "dosa", "pani", "puri", "dal", "naan"]
+
+    def item(pk):
+        name = " ".join(rng.sample(words, 2))
+        return {"id": pk, "name": name, "price": f"{rng.randint(10, 500)}.00"}
+
+    items = {pk: item(pk) for pk in range(1, 501)}
+    index = MenuIndex()
+    for version in range(1, 20):
+        # A few deletes, edits and additions per version, so every sync after
+        # the first takes the incremental path.
+        for pk in rng.sample(sorted(items), 3):
+            del items[pk]
+        for pk in rng.sample(sorted(items), 3):
+            items[pk] = item(pk)
+        for pk in range(max(items) + 1, max(items) + 4):
+            items[pk] = item(pk)
+        data = list(items.values())
+        fresh = MenuIndex()
+        for search in (
+            {"q": "pa"},
+            {"q": "neer"},
+            {"q": "a t", "sort": "-price"},
+            {"min_price": decimal.Decimal(100), "max_price": decimal.Decimal(200)},
+            {"sort": "name", "limit": 20},
+        ):
+            assert index.search(version, data, **search) == fresh.search(
+                version, data, **search
+            )
+        expected = sorted(
+            (record for record in data if "neer" in record["name"]),
+            key=lambda record: (record["name"], record["id"]),
+        )
+        assert index.search(version, data, q="NEER") == expected
+
+
+@pytest.mark.django_db
+def test_checkout_cart(django_assert_max_num_queries):
+    user = User.objects.create_user(username="cartuser", password="cartpass")
+    items = [MenuItem.objects.create(name=f"Dish {i}", price=10 + i) for i in range(10)]
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "cartuser", "password": "cartpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    cart = {"items": [{"menu_item": item.id, "quantity": 2} for item in items]}
+
+    with django_assert_max_num_queries(6):
+        response = client.post("/orders/cart/checkout/", cart, format="json")
+
+    assert response.status_code == 201
+    assert Order.objects.filter(user=user).count() == 10
+    assert [line["total_amount"] for line in response.data["data"]] == [
+        f"{2 * (10 + i)}.00" for i in range(10)
+    ]
+
+
+@pytest.mark.django_db
+def test_checkout_cart_rejects_unknown_items():
+    User.objects.create_user(username="cartuser2", password="cartpass")
+    item = MenuItem.objects.create(name="Soup", price=60)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "cartuser2", "password": "cartpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    response = client.post(
+        "/orders/cart/checkout/",
+        {"items": [{"menu_item": item.id}, {"menu_item": 999, "quantity": 1}]},
+        format="json",
+    )
+    assert response.status_code == 404
+    assert response.data["items"] == [999]
+    assert not Order.objects.exists()
+
+    response = client.post(
+        "/orders/cart/checkout/",
+        {"items": [{"menu_item": item.id, "quantity": 0}]},
+        format="json",
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_checkout_cart_rejects_totals_too_large_for_the_column():
+    User.objects.create_user(username="cartuser3", password="cartpass")
+    item = MenuItem.objects.create(name="Caviar", price="9999.99")
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "cartuser3", "password": "cartpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    too_many = {"items": [{"menu_item": item.id, "quantity": MAX_QUANTITY + 1}]}
+    response = client.post("/orders/cart/checkout/", too_many, format="json")
+    assert response.status_code == 400
+    response = client.post(
+        f"/orders/item/{item.id}/order/", {"quantity": MAX_QUANTITY + 1}, format="json"
+    )
+    assert response.status_code == 400
+
+    unknown = {"items": [{"menu_item": 10**20}]}
+    response = client.post("/orders/cart/checkout/", unknown, format="json")
+    assert response.status_code == 400
+
+    too_long = {"items": [{"menu_item": item.id}] * (MAX_CART_ITEMS + 1)}
+    response = client.post("/orders/cart/checkout/", too_long, format="json")
+    assert response.status_code == 400
+    assert not Order.objects.exists()
+
+    most = {"items": [{"menu_item": item.id, "quantity": MAX_QUANTITY}]}
+    response = client.post("/orders/cart/checkout/", most, format="json")
+    assert response.status_code == 201
+    assert response.data["data"][0]["total_amount"] == str(
+        decimal.Decimal("9999.99") * MAX_QUANTITY
+    )
+
+
+@pytest.mark.django_db
+def test_authenticated_request_skips_user_lookup(django_assert_num_queries):
+    User.objects.create_user(username="fastuser", password="fastpass")
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "fastuser", "password": "fastpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    # Only the order listing itself hits the database.
+    with django_assert_num_queries(1):
+        response = client.get("/orders/user_orders/")
+    assert response.status_code == 200
+
+    client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+    assert client.get("/orders/user_orders/").status_code == 401
+
+
+def test_verified_token_cache_expiry_and_eviction():
+    cache = VerifiedTokenCache(maxsize=2)
+    cache.set(object, "a", {"exp": time.time() + 60})
+    cache.set(object, "b", {"exp": time.time() - 1})
+    assert cache.get(object, "a") is not None
+    assert cache.get(object, "b") is None
+
+    cache.set(object, "c", {"exp": time.time() + 60})
+    cache.set(object, "d", {"exp": time.time() + 60})
+    assert cache.get(object, "a") is None
+    assert cache.get(object, "d") is not None
+
+
+@pytest.mark.django_db
+def test_refresh_checks_blacklist_in_memory(monkeypatch):
+    # The index is only trusted with a cache every process shares.
+    monkeypatch.setattr("orders.blacklist.cache_is_shared", lambda: True)
+    User.objects.create_user(username="refreshuser", password="refreshpass")
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "refreshuser", "password": "refreshpass"},
+        format="json",
+    )
+    refresh = login.data["refresh"]
+
+    # The first check loads the index; after that a token that was never
+    # revoked is accepted without looking at the blacklist table.
+    assert client.post("/api/token/refresh/", {"refresh": refresh}).status_code == 200
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post("/api/token/refresh/", {"refresh": refresh})
+    assert response.status_code == 200
+    assert not [q for q in queries if "blacklistedtoken" in q["sql"]]
+
+    client.post("/orders/logout/", {"refresh_token": refresh}, format="json")
+    response = client.post("/api/token/refresh/", {"refresh": refresh})
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_refresh_sees_blacklist_from_elsewhere(
+    monkeypatch, settings, django_capture_on_commit_callbacks
+):
+    from rest_framework_simplejwt.token_blacklist.models import (
+        BlacklistedToken,
+        OutstandingToken,
+    )
+
+    User.objects.create_user(username="revoked", password="revokedpass")
+    client = APIClient()
+
+    def login():
+        response = client.post(
+            "/orders/login/", {"username": "revoked", "password": "revokedpass"}
+        )
+        return response.data["refresh"]
+
+    def revoke(refresh):
+        # As another process or the Django admin would, not through logout.
+        jti = RefreshToken(refresh)["jti"]
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=jti))
+
+    def refreshes(refresh):
+        response = client.post("/api/token/refresh/", {"refresh": refresh})
+        return response.status_code == 200
+
+    # A per-process cache cannot carry the news, so the table decides.
+    refresh = login()
+    assert refreshes(refresh)
+    revoke(refresh)
+    assert not refreshes(refresh)
+
+    monkeypatch.setattr("orders.blacklist.cache_is_shared", lambda: True)
+    refresh = login()
+    assert refreshes(refresh)
+    with django_capture_on_commit_callbacks(execute=True):
+        revoke(refresh)
+    assert not refreshes(refresh)
+
+    # A row nobody announced is still picked up by the periodic reload.
+    refresh = login()
+    assert refreshes(refresh)
+    revoke(refresh)
+    assert refreshes(refresh)
+    settings.TOKEN_BLACKLIST_RESYNC_SECONDS = 0
+    assert not refreshes(refresh)
+
+
+@pytest.mark.django_db
+def test_async_signup_and_login():
+    client = AsyncClient()
+    signup = async_to_sync(client.post)(
+        "/orders/signup/",
+        {
+            "username": "asyncuser",
+            "email": "async@example.com",
+            "password": "asyncpass",
+        },
+        content_type="application/json",
+    )
+    assert signup.status_code == 201
+    assert User.objects.get(username="asyncuser").check_password("asyncpass")
+
+    login = async_to_sync(client.post)(
+        "/orders/login/",
+        {"username": "asyncuser", "password": "asyncpass"},
+        content_type="application/json",
+    )
+    assert login.status_code == 200
+    assert login.json()["message"] == "Login successful"
+
+    wrong = async_to_sync(client.post)(
+        "/orders/login/",
+        {"username": "asyncuser", "password": "wrongpass"},
+        content_type="application/json",
+    )
+    assert wrong.status_code == 401
+    assert wrong.json()["message"] == "Invalid credentials"
+
+
+@pytest.mark.django_db
+def test_async_user_orders_and_menu(monkeypatch):
+    user = User.objects.create_user(username="asyncreader", password="readpass")
+    item = MenuItem.objects.create(name="Idli", price=35)
+    Order.objects.create(user=user, menu_item=item, quantity=2, total_amount=70)
+    login = APIClient().post(
+        "/orders/login/",
+        {"username": "asyncreader", "password": "readpass"},
+        format="json",
+    )
+    client = AsyncClient()
+    auth = {"Authorization": f"Bearer {login.data['access']}"}
+
+    orders = async_to_sync(client.get)("/orders/user_orders/", headers=auth)
+    assert orders.status_code == 200
+    assert [order["quantity"] for order in orders.json()["data"]] == [2]
+    # Queries run through the async ORM are attributed to the request.
+    assert 'desc="1 queries"' in orders["Server-Timing"]
+
+    menu = async_to_sync(client.get)("/orders/menu/", headers=auth)
+    assert menu.json()["data"] == [{"id": item.id, "name": "Idli", "price": "35.00"}]
+    cached = async_to_sync(client.get)(
+        "/orders/menu/", headers={**auth, "If-None-Match": menu["ETag"]}
+    )
+    assert cached.status_code == 304
+
+    # The version is read through the async cache API: never a blocking
+    # cache call on the event loop.
+    from django.core.cache.backends.locmem import LocMemCache
+    from orders import cache as menu_cache
+
+    version = menu_cache.get_menu_version()
+    assert async_to_sync(menu_cache.aget_menu_version)() == version
+    read_on_loop = []
+    real_get = LocMemCache.get
+
+    def get(self, key, *args, **kwargs):
+        if key == menu_cache.MENU_VERSION_KEY:
+            try:
+                asyncio.get_running_loop()
+                read_on_loop.append(True)
+            except RuntimeError:
+                read_on_loop.append(False)
+        return real_get(self, key, *args, **kwargs)
+
+    monkeypatch.setattr(LocMemCache, "get", get)
+    menu = async_to_sync(client.get)("/orders/menu/", headers=auth)
+    assert menu["ETag"] == menu_cache.menu_etag(version)
+    assert read_on_loop == [False]
+
+    # A new menu version is indexed in a worker thread, off the event loop.
+    indexed_on_loop = []
+    real_sync = MenuIndex.sync
+
+    def sync(self, version, data):
+        try:
+            asyncio.get_running_loop()
+            indexed_on_loop.append(True)
+        except RuntimeError:
+            indexed_on_loop.append(False)
+        return real_sync(self, version, data)
+
+    monkeypatch.setattr(MenuIndex, "sync", sync)
+    found = async_to_sync(client.get)("/orders/menu/", {"q": "idl"}, headers=auth)
+    assert [row["name"] for row in found.json()["data"]] == ["Idli"]
+    assert indexed_on_loop[0] is False
+
+    client = AsyncClient()
+    auth = {"Authorization": "Bearer not-a-token"}
+    assert (
+        async_to_sync(client.get)("/orders/user_orders/", headers=auth).status_code
+        == 401
+    )
+
+
+@pytest.mark.django_db
+def test_projections_render_like_serializers():
+    user = User.objects.create_user(
+        username="projected", email="p@example.com", password="x"
+    )
+    User.objects.create_user(username="projected_admin", password="x", is_admin=True)
+    cheap = MenuItem.objects.create(name="Chai", price="12.50")
+    dear = MenuItem.objects.create(name="Thali", price="249.99")
+    Order.objects.create(user=user, menu_item=cheap, quantity=3, total_amount=37)
+    Order.objects.create(user=user, menu_item=dear, quantity=1, total_amount=249)
+
+    renderer = JSONRenderer()
+    for projection, queryset in (
+        (menu_item_projection, MenuItem.objects.order_by("id")),
+        (order_projection, Order.objects.order_by("id")),
+        (user_projection, User.objects.order_by("id")),
+    ):
+        expected = projection.serializer_class(queryset, many=True).data
+        rendered = projection.render(projection.values(queryset))
+        assert renderer.render(rendered) == renderer.render(expected)
+
+
+@pytest.mark.django_db
+def test_server_timing_and_query_log(caplog):
+    User.objects.create_user(username="timed", password="timedpass")
+    MenuItem.objects.create(name="Tea", price=20)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/", {"username": "timed", "password": "timedpass"}, format="json"
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    with caplog.at_level("INFO", logger="food_ordering_api.queries"):
+        response = client.get("/orders/user_orders/")
+
+    assert response["Server-Timing"].startswith("db;dur=")
+    assert 'desc="1 queries"' in response["Server-Timing"]
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line["path"] == "/orders/user_orders/"
+    assert line["status"] == 200
+    assert line["queries"] == 1
+    assert line["repeated"] == 0
+
+
+@pytest.mark.django_db
+def test_repeated_queries_are_flagged():
+    items = [MenuItem.objects.create(name=f"Dish {i}", price=10) for i in range(3)]
+    with record_queries() as queries:
+        for item in items:
+            MenuItem.objects.get(pk=item.pk)
+    assert queries.repeated(3)[0]["count"] == 3
+    assert queries.repeated(4) == []
+
+
+@pytest.mark.django_db
+def test_order_menu_item_query_budget(query_budget):
+    User.objects.create_user(username="budget", password="budgetpass")
+    item = MenuItem.objects.create(name="Dosa", price=decimal.Decimal("12.35"))
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "budget", "password": "budgetpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    # Item lookup and INSERT, plus the sales rollup upsert and outbox INSERT.
+    with query_budget(4):
+        response = client.post(
+            f"/orders/item/{item.id}/order/", {"quantity": 3}, format="json"
+        )
+    assert response.status_code == 201
+    # Stored exactly, and rendered as the serializer would render the row.
+    order = Order.objects.get()
+    assert order.total_amount == decimal.Decimal("37.05")
+    assert response.data["data"] == OrderSerializer(order).data
+
+
+@pytest.mark.django_db
+def test_order_menu_item_idempotency_key(query_budget):
+    User.objects.create_user(username="retry", password="retrypass")
+    item = MenuItem.objects.create(name="Vada", price=30)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/", {"username": "retry", "password": "retrypass"}, format="json"
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    url = f"/orders/item/{item.id}/order/"
+
+    first = client.post(url, {"quantity": 2}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+    with query_budget(0):
+        replay = client.post(
+            url, {"quantity": 2}, format="json", HTTP_IDEMPOTENCY_KEY="k1"
+        )
+
+    assert first.status_code == replay.status_code == 201
+    assert replay.data == first.data
+    assert replay["Idempotent-Replayed"] == "true"
+    assert Order.objects.count() == 1
+
+    reused = client.post(url, {"quantity": 3}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+    assert reused.status_code == 422
+    client.post(url, {"quantity": 2}, format="json", HTTP_IDEMPOTENCY_KEY="k2")
+    assert Order.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_concurrent_idempotent_request_waits_for_the_first(settings):
+    from django.core.cache import cache
+
+    settings.IDEMPOTENCY_LOCK_TIMEOUT = 1
+    User.objects.create_user(username="racer", password="racerpass")
+    item = MenuItem.objects.create(name="Upma", price=40)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/", {"username": "racer", "password": "racerpass"}, format="json"
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    user_id = User.objects.get(username="racer").id
+    digest = hashlib.sha256(b"k1").hexdigest()
+
+    # Simulate the first request still running when the retry arrives.
+    cache.add(f"idempotency:{user_id}:{digest}:lock", True)
+    response = client.post(
+        f"/orders/item/{item.id}/order/",
+        {"quantity": 1},
+        format="json",
+        HTTP_IDEMPOTENCY_KEY="k1",
+    )
+    assert response.status_code == 409
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_idempotent_request_rechecks_after_taking_the_lock(monkeypatch):
+    from django.core.cache import cache
+
+    User.objects.create_user(username="late", password="latepass")
+    item = MenuItem.objects.create(name="Poha", price=30)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/", {"username": "late", "password": "latepass"}, format="json"
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    url = f"/orders/item/{item.id}/order/"
+    first = client.post(url, {"quantity": 1}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+
+    # The retry's first read misses, as if it ran just before the first
+    # request stored its response and released the lock.
+    reads = []
+    real_get = cache.get
+
+    def get(key, *args, **kwargs):
+        if key.startswith("idempotency:"):
+            reads.append(key)
+            if len(reads) == 1:
+                return None
+        return real_get(key, *args, **kwargs)
+
+    monkeypatch.setattr("orders.decorators.cache.get", get)
+    replay = client.post(url, {"quantity": 1}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+    assert replay["Idempotent-Replayed"] == "true"
+    assert replay.data == first.data
+    assert Order.objects.count() == 1
+
+
+def _throttle_rates(settings, **rates):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {
+            "order": None,
+            "signup": None,
+            "login": None,
+            **rates,
+        },
+    }
+
+
+def test_token_bucket_under_concurrent_load(settings):
+    _throttle_rates(settings, order="10/min")
+    request = APIRequestFactory().post("/orders/cart/checkout/")
+
+    def attempt(_):
+        return OrderThrottle().allow_request(request, None)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(attempt, range(64)))
+    assert results.count(True) == 10
+
+
+def test_token_bucket_refills(settings):
+    _throttle_rates(settings, order="2/min")
+    request = APIRequestFactory().post("/orders/cart/checkout/")
+    now = [1000.0]
+
+    def throttle():
+        instance = OrderThrottle()
+        instance.timer = lambda: now[0]
+        return instance
+
+    assert throttle().allow_request(request, None)
+    assert throttle().allow_request(request, None)
+    rejected = throttle()
+    assert not rejected.allow_request(request, None)
+    assert rejected.wait() == pytest.approx(30)
+
+    now[0] += 30
+    assert throttle().allow_request(request, None)
+    assert not throttle().allow_request(request, None)
+
+
+@pytest.mark.django_db
+def test_login_is_throttled_per_ip(settings):
+    _throttle_rates(settings, login="2/min")
+    User.objects.create_user(username="hammer", password="hammerpass")
+    client = APIClient()
+    payload = {"username": "hammer", "password": "wrong"}
+
+    assert client.post("/orders/login/", payload, format="json").status_code == 401
+    assert client.post("/orders/login/", payload, format="json").status_code == 401
+    response = client.post("/orders/login/", payload, format="json")
+    assert response.status_code == 429
+    assert 25 <= int(response["Retry-After"]) <= 30
+
+    # The ASGI login shares the bucket.
+    response = async_to_sync(AsyncClient().post)(
+        "/orders/login/", payload, content_type="application/json"
+    )
+    assert response.status_code == 429
+    assert 25 <= int(response["Retry-After"]) <= 30
+
+
+@pytest.mark.django_db
+def test_replica_routing(settings):
+    settings.REPLICA_DATABASE = "replica"
+    user = User.objects.create_user(username="lagging", password="laggingpass")
+    seen = []
+
+    @use_replica
+    def view(request):
+        seen.append(MenuItem.objects.all().db)
+        return Response(status=201 if request.method == "POST" else 200)
+
+    view(SimpleNamespace(method="GET", user_id=user.id))
+    assert seen[-1] == "replica"
+    assert Order.objects.all().db == "default"
+
+    # A write pins the user to the primary for the sticky window.
+    view(SimpleNamespace(method="POST", user_id=user.id))
+    assert seen[-1] == "default"
+    view(SimpleNamespace(method="GET", user_id=user.id))
+    assert seen[-1] == "default"
+    view(SimpleNamespace(method="GET", user_id=None))
+    assert seen[-1] == "replica"
+
+    @use_replica
+    async def async_view(request):
+        seen.append(await sync_to_async(lambda: MenuItem.objects.all().db)())
+        return JsonResponse({})
+
+    async_to_sync(async_view)(SimpleNamespace(method="GET", user_id=None))
+    assert seen[-1] == "replica"
+
+
+@pytest.mark.django_db(databases=["default", "replica"], transaction=True)
+@pytest.mark.skipif(
+    "replica" not in django_settings.DATABASES,
+    reason="set REPLICA_NAME to run against a replica alias",
+)
+def test_user_orders_read_from_replica(settings):
+    settings.REPLICA_DATABASE = "replica"
+    User.objects.create_user(username="reader", password="readerpass")
+    item = MenuItem.objects.create(name="Pongal", price=45)
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "reader", "password": "readerpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    # The replica's position for the sync token, then the page.
+    with CaptureQueriesContext(connections["replica"]) as replica:
+        client.get("/orders/user_orders/")
+    assert len(replica) == 2
+
+    client.post(f"/orders/item/{item.id}/order/", {"quantity": 1}, format="json")
+    with CaptureQueriesContext(connections["replica"]) as replica:
+        response = client.get("/orders/user_orders/")
+    assert len(replica) == 0
+    assert len(response.data["data"]) == 1
+
+
+def test_fast_json_renderer_matches_drf():
+    data = {
+        "status": "success",
+        "data": [
+            {
+                "id": 1,
+                "price": decimal.Decimal("12.50"),
+                "at": datetime.datetime(
+                    2024, 5, 1, 9, 30, tzinfo=datetime.timezone.utc
+                ),
+                "naive": datetime.datetime(2024, 5, 1, 9, 30, 0, 123456),
+                "day": datetime.date(2024, 5, 1),
+                "name": "Crème brûlée\u2028line\u2029",
+                "tags": ("a", "b"),
+                "ok": True,
+                "none": None,
+            }
+        ],
+    }
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+    assert FastJSONRenderer().render(
+        data, "application/json; indent=2"
+    ) == JSONRenderer().render(data, "application/json; indent=2")
+
+
+@pytest.mark.django_db
+def test_response_compression(settings):
+    settings.COMPRESSION_MIN_SIZE = 200
+    User.objects.create_user(username="zipper", password="zipperpass")
+    MenuItem.objects.bulk_create(
+        [MenuItem(name=f"Dish {i}", price=10 + i) for i in range(50)]
+    )
+    client = APIClient()
+    login = client.post(
+        "/orders/login/",
+        {"username": "zipper", "password": "zipperpass"},
+        format="json",
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    plain = client.get("/orders/menu/")
+    assert "Content-Encoding" not in plain
+
+    gzipped = client.get("/orders/menu/", HTTP_ACCEPT_ENCODING="gzip")
+    assert gzipped["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gzipped.content) == plain.content
+    assert "Accept-Encoding" in gzipped["Vary"]
+
+    brotlied = client.get("/orders/menu/", HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+    assert brotlied["Content-Encoding"] == "br"
+    assert brotli.decompress(brotlied.content) == plain.content
+    assert brotlied["ETag"] == f"W/{plain['ETag']}"
+
+    # The weakened ETag still revalidates.
+    not_modified = client.get(
+        "/orders/menu/",
+        HTTP_ACCEPT_ENCODING="br",
+        HTTP_IF_NONE_MATCH=brotlied["ETag"],
+    )
+    assert not_modified.status_code == 304
+
+    refused = client.get("/orders/menu/", HTTP_ACCEPT_ENCODING="br;q=0, gzip;q=0.5")
+    assert refused["Content-Encoding"] == "gzip"
+
+    small = client.get("/orders/user_orders/", HTTP_ACCEPT_ENCODING="gzip")
+    assert "Content-Encoding" not in small
+
+
+def test_event_streams_are_not_compressed():
+    middleware = CompressionMiddleware(lambda request: None)
+    request = APIRequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+    response = StreamingHttpResponse(
+        iter([b"data: 1\n\n"]), content_type="text/event-stream"
+    )
+    assert middleware.process_response(request, response) is response
+    assert "Content-Encoding" not in response
+
+
+def _login(client, username, password="cancelpass"):
+    User.objects.create_user(username=username, password=password)
+    login = client.post(
+        "/orders/login/", {"username": username, "password": password}, format="json"
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+    return User.objects.get(username=username)
+
+
+@pytest.mark.django_db
+def test_cancel_order_deletes_latest_in_one_statement(query_budget):
+    client = APIClient()
+    user = _login(client, "canceller")
+    item = MenuItem.objects.create(name="Chai", price=decimal.Decimal("12.50"))
+    first = Order.objects.create(
+        user=user, menu_item=item, quantity=1, total_amount=decimal.Decimal("12.50")
+    )
+    Order.objects.create(
+        user=user, menu_item=item, quantity=2, total_amount=decimal.Decimal("25.00")
+    )
+    record_orders(Order.objects.all())
+
+    # DELETE ... RETURNING, then the rollup upsert, tombstone and outbox INSERTs.
+    with query_budget(4):
+        response = client.delete(f"/orders/item{item.id}/cancel/")
+    assert response.status_code == 200
+    assert response.data["data"]["refund_amount"] == "25.00"
+    assert list(Order.objects.values_list("id", flat=True)) == [first.id]
+    rollup = SalesRollup.objects.get(menu_item=item, granularity=SalesRollup.DAY)
+    assert (rollup.quantity, rollup.revenue) == (1, decimal.Decimal("12.50"))
+
+
+@pytest.mark.django_db
+def test_bulk_cancel():
+    client = APIClient()
+    user = _login(client, "bulkcancel")
+    other = User.objects.create_user(username="bystander", password="x")
+    tea = MenuItem.objects.create(name="Tea", price=20)
+    cake = MenuItem.objects.create(name="Cake", price=60)
+    teas = [
+        Order.objects.create(user=user, menu_item=tea, quantity=1, total_amount=20)
+        for _ in range(3)
+    ]
+    cakes = [
+        Order.objects.create(user=user, menu_item=cake, quantity=2, total_amount=120)
+        for _ in range(2)
+    ]
+    theirs = Order.objects.create(
+        user=other, menu_item=tea, quantity=1, total_amount=20
+    )
+
+    # Someone else's order makes the whole request fail.
+    response = client.post(
+        "/orders/cancel/", {"orders": [cakes[0].id, theirs.id]}, format="json"
+    )
+    assert response.status_code == 404
+    assert response.data["orders"] == [theirs.id]
+    assert Order.objects.count() == 6
+
+    response = client.post(
+        "/orders/cancel/", {"orders": [cake.id for cake in cakes]}, format="json"
+    )
+    assert response.status_code == 200
+    assert response.data["data"] == {
+        "cancelled": [cake.id for cake in cakes],
+        "refund_amount": "240.00",
+    }
+
+    response = client.post("/orders/cancel/", {"menu_item": tea.id}, format="json")
+    assert response.data["data"]["cancelled"] == [order.id for order in teas]
+    assert list(Order.objects.all()) == [theirs]
+
+    response = client.post("/orders/cancel/", {"menu_item": tea.id}, format="json")
+    assert response.status_code == 404
+    response = client.post(
+        "/orders/cancel/", {"orders": [1], "menu_item": tea.id}, format="json"
+    )
+    assert response.status_code == 400
+    for body in ({"orders": [10**20]}, {"menu_item": 10**20}):
+        response = client.post("/orders/cancel/", body, format="json")
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_order_events_delivered_through_outbox(settings, tmp_path):
+    client = APIClient()
+    _login(client, "outboxer")
+    item = MenuItem.objects.create(name="Samosa", price=15)
+    client.post(f"/orders/item/{item.id}/order/", {"quantity": 2}, format="json")
+    client.delete(f"/orders/item{item.id}/cancel/")
+    # A rolled-back cancellation leaves no event behind.
+    client.post("/orders/cancel/", {"orders": [12345]}, format="json")
+    assert list(OutboxEvent.objects.values_list("topic", flat=True)) == [
+        ORDER_PLACED,
+        ORDER_CANCELLED,
+    ]
+
+    settings.OUTBOX_BACKOFF = 0
+    kitchen, analytics = MemorySink(), MemorySink(fail=1)
+    sinks = {"kitchen": kitchen, "analytics": analytics}
+    with ThreadPoolExecutor(2) as executor:
+        assert drain(sinks, executor) == 2
+        pending = OutboxEvent.objects.filter(delivered_at__isnull=True)
+        assert [event.delivered_to for event in pending] == [["kitchen"]] * 2
+        assert pending[0].attempts == 1
+        assert "sink unavailable" in pending[0].last_error
+
+        # The retry goes only to the sink that failed.
+        assert drain(sinks, executor) == 2
+        assert drain(sinks, executor) == 0
+
+    assert [message["topic"] for message in kitchen.messages] == [
+        ORDER_PLACED,
+        ORDER_CANCELLED,
+    ]
+    assert analytics.messages == kitchen.messages
+    assert kitchen.messages[0]["payload"]["total_amount"] == "30.00"
+
+    OutboxEvent.objects.update(delivered_at=None, delivered_to=[])
+    path = tmp_path / "events.ndjson"
+    settings.OUTBOX_SINKS = {
+        "file": {"BACKEND": "orders.outbox.FileSink", "OPTIONS": {"path": path}}
+    }
+    call_command("drain_outbox", once=True, stdout=io.StringIO())
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["id"] for line in lines] == [m["id"] for m in kitchen.messages]
+
+
+@pytest.mark.django_db
+def test_user_orders_delta_sync(query_budget, settings):
+    client = APIClient()
+    user = _login(client, "syncer")
+    other = User.objects.create_user(username="neighbour", password="x")
+    item = MenuItem.objects.create(name="Upma", price=40)
+    old = [
+        Order.objects.create(user=user, menu_item=item, quantity=1, total_amount=40)
+        for _ in range(50)
+    ]
+    Order.objects.update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+
+    full = client.get("/orders/user_orders/", {"page_size": 10})
+    assert len(full.data["data"]) == 10
+    assert "updated_at" not in full.data["data"][0]
+    token = full.data["sync_token"]
+
+    placed = client.post(f"/orders/item/{item.id}/order/", {"quantity": 3}).data
+    Order.objects.create(user=other, menu_item=item, quantity=1, total_amount=40)
+    client.post("/orders/cancel/", {"orders": [old[0].id, old[1].id]}, format="json")
+
+    # Two index range scans, sized by the changes rather than the history.
+    with query_budget(2):
+        delta = client.get("/orders/user_orders/", {"since": token})
+    assert delta.status_code == 200
+    assert delta.data["data"] == [placed["data"]]
+    assert delta.data["deleted"] == [old[0].id, old[1].id]
+
+    # Deleting a menu item removes its orders too.
+    MenuItem.objects.get(pk=item.id).delete()
+    delta = client.get("/orders/user_orders/", {"since": delta.data["sync_token"]})
+    # The token overlaps the previous sync, so its two cancellations come again.
+    assert delta.data["deleted"] == sorted(
+        [order.id for order in old] + [placed["data"]["id"]]
+    )
+    assert delta.data["data"] == []
+
+    response = async_to_sync(AsyncClient().get)(
+        "/orders/user_orders/",
+        {"since": token},
+        headers={"Authorization": full.wsgi_request.META["HTTP_AUTHORIZATION"]},
+    )
+    assert response.json()["data"] == []
+    assert len(response.json()["deleted"]) == 51
+
+    assert client.get("/orders/user_orders/", {"since": "junk"}).status_code == 400
+    settings.ORDER_TOMBSTONE_RETENTION_DAYS = 0
+    assert client.get("/orders/user_orders/", {"since": token}).status_code == 410
+
+
+@pytest.mark.django_db
+def test_user_orders_token_from_replica(monkeypatch, settings):
+    # Treat "default" as the replica: its data is an hour behind the clock.
+    monkeypatch.setattr("orders.sync.DATABASE", "primary")
+    client = APIClient()
+    user = _login(client, "lagged")
+    item = MenuItem.objects.create(name="Poha", price=30)
+    Order.objects.create(user=user, menu_item=item, quantity=1, total_amount=30)
+    applied = timezone.now() - datetime.timedelta(hours=1)
+    Order.objects.update(updated_at=applied)
+    overlap = datetime.timedelta(seconds=settings.ORDER_SYNC_OVERLAP_SECONDS)
+
+    full = client.get("/orders/user_orders/")
+    assert parse_sync_token(full.data["sync_token"]) == applied - overlap
+    response = async_to_sync(AsyncClient().get)(
+        "/orders/user_orders/",
+        headers={"Authorization": full.wsgi_request.META["HTTP_AUTHORIZATION"]},
+    )
+    assert parse_sync_token(response.json()["sync_token"]) == applied - overlap
+
+    # Nothing on the replica yet: the token is expired from the start.
+    Order.objects.all().delete()
+    token = client.get("/orders/user_orders/").data["sync_token"]
+    with pytest.raises(ExpiredSyncToken):
+        parse_sync_token(token)